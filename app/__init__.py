@@ -27,8 +27,6 @@ mysql = MySQL()
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
-    app.config["SESSION_PERMANENT"] = False
-    app.config["SESSION_TYPE"] = "filesystem"
     app.config['MYSQL_DATABASE_HOST'] = 'localhost'
     app.config['MYSQL_DATABASE_USER'] = 'root'
     app.config['MYSQL_DATABASE_DB'] = 'app'
@@ -39,8 +37,11 @@ def create_app(config_class=Config):
     mail.init_app(app)
     moment.init_app(app)
     bootstrap.init_app(app)
-    session.init_app(app)
+    from app.sessions import init_session
+    init_session(app, session)
     mysql.init_app(app)
+    from app.instrumentation import init_instrumentation
+    init_instrumentation(app)
 
     from app.auth import bp as auth_bp
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -51,6 +52,9 @@ def create_app(config_class=Config):
     from app.new_study import bp as new_study_bp
     app.register_blueprint(new_study_bp, url_prefix='/new_study')
 
+    from app.admin import bp as admin_bp
+    app.register_blueprint(admin_bp, url_prefix='/admin')
+
     if not app.debug and not app.testing:
         if app.config['MAIL_SERVER']:
             auth = None
@@ -0,0 +1,40 @@
+from flask import render_template, flash, redirect, url_for, request, jsonify, current_app
+from flask_login import current_user, login_required
+
+from app.admin import bp
+from app.instrumentation import app_metrics
+from app.main.forms import EmptyForm
+
+
+@bp.route('/metrics', methods=['GET', 'POST'])
+@login_required
+def metrics():
+    # Alleen de beheerders (ADMINS) kunnen de metingen bekijken.
+    if current_user.email not in current_app.config['ADMINS']:
+        return redirect(url_for('main.not_authorized'))
+
+    metrics = app_metrics(current_app)
+
+    # De Form om de metingen te wissen.
+    form = EmptyForm()
+    if metrics is not None and form.validate_on_submit():
+        metrics.clear()
+        flash('The metrics have been reset.')
+        return redirect(url_for('admin.metrics'))
+
+    # De metingen als JSON (bijvoorbeeld voor scripts).
+    if request.args.get('format') == 'json':
+        if metrics is None:
+            return jsonify(enabled=False)
+        return jsonify(enabled=True, endpoints=[
+            {'endpoint': endpoint.endpoint, 'requests': endpoint.requests, 'queries': endpoint.average_queries(),
+             'max_queries': endpoint.max_queries, 'sql_ms': endpoint.average_sql_time() * 1000,
+             'python_ms': endpoint.average_python_time() * 1000,
+             'slowest': [{'ms': duration * 1000, 'statement': statement}
+                         for (duration, statement) in endpoint.slowest_statements()]}
+            for endpoint in metrics.sorted_endpoints()],
+            recent=[{'endpoint': measurement.endpoint, 'path': measurement.path, 'queries': measurement.queries,
+                     'sql_ms': measurement.sql_time * 1000, 'python_ms': measurement.python_time() * 1000}
+                    for measurement in metrics.recent_requests()])
+
+    return render_template('admin/metrics.html', title='Metrics', metrics=metrics, form=form)
@@ -0,0 +1,5 @@
+# De rekenmodules voor de data-analyse (betrouwbaarheid, validiteit en het PLS-model). Deze werken op één numerieke
+# antwoordmatrix in plaats van per case of per item door de dataset te lopen.
+# De rekenmodules laden numpy en pandas (en "context", "bootstrap" en "pipeline" ook plspm) en worden daarom alleen
+# via "app/new_study/analysis.py" geïmporteerd. "cache", "jobs", "questions" en "running" laden deze niet en kunnen
+# overal gebruikt worden.
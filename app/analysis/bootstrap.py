@@ -0,0 +1,130 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from plspm.plspm import Plspm
+from plspm.scheme import Scheme
+
+from app.analysis.context import config_from_paths, model_paths
+from app.analysis.htmt import correlation_matrix, htmt_from_correlations
+from app.analysis.reliability import answer_matrix, construct_indexes
+
+# Het bootstrappen van het PLS-padmodel: het model wordt opnieuw geschat op steekproeven (met teruglegging) uit de
+# cases, waarmee per padcoëfficiënt en per HTMT-ratio het gemiddelde, de standaardfout, de t-waarde en een
+# betrouwbaarheidsinterval (percentielen) bepaald worden. De steekproeven worden in stukken verdeeld over meerdere
+# processen. Iedere steekproef heeft een eigen seed (afgeleid van één seed), waardoor de uitkomst niet afhangt van het
+# aantal processen.
+
+# Het aantal stukken per proces, zodat een proces dat eerder klaar is een volgend stuk kan oppakken.
+CHUNKS_PER_WORKER = 4
+
+
+# De padcoëfficiënten en HTMT-ratio's van de steekproeven met de gegeven seeds (één rij per steekproef). Alleen gewone
+# data (matrix, item codes, afkortingen en paden) wordt meegegeven, zodat dit binnen een ander proces uitgevoerd kan
+# worden. Een steekproef waarop het model niet geschat kan worden (bijvoorbeeld door een item zonder variantie) krijgt
+# NaN als waarden.
+def bootstrap_chunk(matrix, columns, abbreviations, paths, seeds, scheme=Scheme.CENTROID):
+    blocks = [construct_indexes(columns, abbreviation) for abbreviation in abbreviations]
+    pairs = np.triu_indices(len(abbreviations), 1)
+    coefficients = np.full((len(seeds), len(paths)), np.nan)
+    ratios = np.full((len(seeds), len(pairs[0])), np.nan)
+
+    for (row, seed) in enumerate(seeds):
+        sample = matrix[np.random.default_rng(seed).integers(0, matrix.shape[0], matrix.shape[0])]
+        ratios[row] = htmt_from_correlations(correlation_matrix(sample), blocks)[pairs]
+
+        dataset = pd.DataFrame(sample, columns=columns)
+        try:
+            path_coefficients = Plspm(dataset, config_from_paths(dataset, abbreviations, paths),
+                                      scheme).path_coefficients()
+        except Exception:
+            continue
+        coefficients[row] = [path_coefficients.loc[influenced, influencer] for (influencer, influenced) in paths]
+
+    return coefficients, ratios
+
+
+# Per kolom (een padcoëfficiënt of HTMT-ratio) de oorspronkelijke schatting, het gemiddelde en de standaardfout over de
+# steekproeven, de t-waarde (schatting gedeeld door de standaardfout) en het betrouwbaarheidsinterval.
+def bootstrap_statistics(original, samples, index, confidence):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        standard_errors = np.nanstd(samples, axis=0, ddof=1)
+        statistics = pd.DataFrame({
+            'original': original,
+            'mean': np.nanmean(samples, axis=0),
+            'standard_error': standard_errors,
+            't_value': np.asarray(original) / standard_errors,
+            'lower': np.nanpercentile(samples, 100 * (1 - confidence) / 2, axis=0),
+            'upper': np.nanpercentile(samples, 100 * (1 + confidence) / 2, axis=0)}, index=index)
+    return statistics
+
+
+# De uitkomst van het bootstrappen: Pandas Dataframes met per pad ("PE -> BI") en per paar van kernvariabelen
+# ("PE - EE") de statistieken uit "bootstrap_statistics", het aantal steekproeven en het aantal steekproeven waarop het
+# model geschat kon worden.
+class BootstrapResults(object):
+    def __init__(self, paths, htmt, samples, valid, confidence):
+        self.paths = paths
+        self.htmt = htmt
+        self.samples = samples
+        self.valid = valid
+        self.confidence = confidence
+
+    def __repr__(self):
+        return '<Bootstrap results {} samples>'.format(self.samples)
+
+
+# Het bootstrappen van het padmodel van de dataset met "samples" steekproeven, verdeeld over "workers" processen (None
+# voor het aantal processoren; bij 1 proces wordt alles binnen het huidige proces uitgevoerd). Met "progress" kan de
+# voortgang gevolgd worden (aangeroepen met het aantal afgeronde en het totale aantal stukken). Zijn de
+# padcoëfficiënten van het oorspronkelijke model al bekend ("path_coefficients", zoals binnen "AnalysisContext"), dan
+# wordt het model niet nogmaals op de volledige dataset geschat.
+def bootstrap(dataset, corevariables, relations, samples=1000, workers=None, seed=0, confidence=0.95,
+              scheme=Scheme.CENTROID, progress=None, path_coefficients=None):
+    if samples < 2:
+        raise ValueError('At least 2 bootstrap samples are needed')
+    if not 0 < confidence < 1:
+        raise ValueError('confidence must be between 0 and 1')
+    workers = workers or os.cpu_count() or 1
+
+    matrix, columns = answer_matrix(dataset)
+    abbreviations = [corevariable.abbreviation for corevariable in corevariables]
+    paths = model_paths(corevariables, relations)
+
+    # Het oorspronkelijke model en de oorspronkelijke HTMT-ratio's.
+    if path_coefficients is None:
+        path_coefficients = Plspm(dataset, config_from_paths(dataset, abbreviations, paths),
+                                  scheme).path_coefficients()
+    original_coefficients = [path_coefficients.loc[influenced, influencer] for (influencer, influenced) in paths]
+    blocks = [construct_indexes(columns, abbreviation) for abbreviation in abbreviations]
+    pairs = np.triu_indices(len(abbreviations), 1)
+    original_ratios = htmt_from_correlations(correlation_matrix(matrix), blocks)[pairs]
+
+    # De seeds van alle steekproeven, in vaste volgorde verdeeld over de stukken.
+    seeds = np.random.SeedSequence(seed).spawn(samples)
+    chunks = [list(chunk) for chunk in np.array_split(np.array(seeds, dtype=object),
+                                                      min(samples, workers * CHUNKS_PER_WORKER)) if len(chunk) > 0]
+    results = [None] * len(chunks)
+    if workers == 1:
+        for (number, chunk) in enumerate(chunks):
+            results[number] = bootstrap_chunk(matrix, columns, abbreviations, paths, chunk, scheme)
+            if progress is not None:
+                progress(number + 1, len(chunks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(bootstrap_chunk, matrix, columns, abbreviations, paths, chunk, scheme): number
+                       for (number, chunk) in enumerate(chunks)}
+            for (done, future) in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if progress is not None:
+                    progress(done, len(chunks))
+
+    coefficients = np.vstack([result[0] for result in results])
+    ratios = np.vstack([result[1] for result in results])
+    path_names = ['{} -> {}'.format(influencer, influenced) for (influencer, influenced) in paths]
+    pair_names = ['{} - {}'.format(abbreviations[first], abbreviations[second]) for (first, second) in zip(*pairs)]
+
+    return BootstrapResults(bootstrap_statistics(original_coefficients, coefficients, path_names, confidence),
+                            bootstrap_statistics(original_ratios, ratios, pair_names, confidence), samples,
+                            int(np.sum(~np.isnan(coefficients).any(axis=1))), confidence)
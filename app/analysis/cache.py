@@ -0,0 +1,78 @@
+import json
+from datetime import datetime
+from hashlib import md5
+
+from flask import current_app
+from sqlalchemy import func
+
+from app import db
+from app.models import AnalysisCache, Answer, Question, QuestionGroup, Relation
+
+# Verhogen zodra de opbouw van de opgeslagen resultaten verandert, zodat oude resultaten opnieuw berekend worden.
+RESULTS_VERSION = 4
+
+
+# Een "fingerprint" van alles waarop de resultaten van de data-analyse gebaseerd zijn: het aantal antwoorden en de
+# hoogste antwoord-ID, de vragen (met hun codes), de kernvariabelen en relaties binnen het onderzoeksmodel en de
+# instellingen van het bootstrappen.
+def data_fingerprint(questionnaire, model):
+    answers = db.session.query(func.count(Answer.id), func.max(Answer.id)) \
+        .join(Question, Answer.question_id == Question.id) \
+        .join(QuestionGroup, Question.questiongroup_id == QuestionGroup.id) \
+        .filter(QuestionGroup.questionnaire_id == questionnaire.id).one()
+    questions = db.session.query(Question.id, Question.question_code) \
+        .join(QuestionGroup, Question.questiongroup_id == QuestionGroup.id) \
+        .filter(QuestionGroup.questionnaire_id == questionnaire.id).order_by(Question.id).all()
+    corevariables = sorted((corevariable.id, corevariable.abbreviation) for corevariable in model.linked_corevariables)
+    relations = sorted((relation.influencer_id, relation.influenced_id) for relation in
+                       Relation.query.filter_by(model_id=model.id))
+
+    config = current_app.config
+    bootstrap = (analysis_bootstrap_samples(), config['BOOTSTRAP_SEED'], config['BOOTSTRAP_CONFIDENCE'])
+
+    data = [RESULTS_VERSION, tuple(answers), [tuple(question) for question in questions], corevariables, relations,
+            bootstrap]
+    return md5(repr(data).encode('utf-8')).hexdigest()
+
+
+# Het aantal bootstrap-steekproeven van de data-analyse. Het bootstrappen start meerdere processen en duurt veel langer
+# dan de rest van de analyse, en gebeurt daarom alleen binnen "flask analysis worker" (met ANALYSIS_JOBS), nooit binnen
+# een verzoek. Zonder ANALYSIS_JOBS wordt BOOTSTRAP_SAMPLES genegeerd.
+def analysis_bootstrap_samples():
+    config = current_app.config
+    return config['BOOTSTRAP_SAMPLES'] if config['ANALYSIS_JOBS'] else 0
+
+
+# De resultaten van de data-analyse van een onderzoek. Voor afgeronde onderzoeken (stage_3) worden de resultaten
+# opgeslagen in de database en alleen opnieuw berekend (met "compute") als de fingerprint niet meer overeenkomt.
+def cached_results(study, questionnaire, model, compute):
+    if not study.stage_3:
+        return compute()
+
+    fingerprint = data_fingerprint(questionnaire, model)
+    cache = AnalysisCache.query.filter_by(study_id=study.id).first()
+    if cache is not None and cache.fingerprint == fingerprint:
+        return json.loads(cache.results)
+
+    results = compute()
+    if cache is None:
+        cache = AnalysisCache(study_id=study.id)
+        db.session.add(cache)
+    cache.fingerprint = fingerprint
+    cache.created = datetime.utcnow()
+    cache.results = json.dumps(results)
+    db.session.commit()
+
+    return results
+
+
+# De opgeslagen resultaten van een afgerond onderzoek zonder deze te berekenen, of None als er (nog) geen resultaten
+# zijn die bij de huidige fingerprint horen.
+def stored_results(study, questionnaire, model):
+    if not study.stage_3:
+        return None
+
+    cache = AnalysisCache.query.filter_by(study_id=study.id).first()
+    if cache is not None and cache.fingerprint == data_fingerprint(questionnaire, model):
+        return json.loads(cache.results)
+    return None
@@ -0,0 +1,71 @@
+import plspm.config as c
+from plspm.mode import Mode
+from plspm.plspm import Plspm
+from plspm.scheme import Scheme
+
+from app.analysis import reliability
+
+
+# De paden tussen de kernvariabelen (op basis van de relaties binnen het onderzoeksmodel) als lijst met tuples
+# (afkorting beïnvloedende kernvariabele, afkorting beïnvloede kernvariabele).
+def model_paths(corevariables, relations):
+    return [(corevariable.abbreviation, relation.influenced.abbreviation) for corevariable in corevariables
+            for relation in relations if relation.influencer_id == corevariable.id]
+
+
+# Het opzetten van de configuratie voor het plspm package op basis van alleen afkortingen: de paden tussen de
+# kernvariabelen en per kernvariabele de bijbehorende items binnen de dataset. Hierdoor kan de configuratie ook buiten
+# de database om opgezet worden (zoals binnen de processen van de bootstrap, zie "app/analysis/bootstrap.py").
+def config_from_paths(dataset, abbreviations, paths):
+    structure = c.Structure()
+    for abbreviation in abbreviations:
+        influenced_variables = [influenced for (influencer, influenced) in paths if influencer == abbreviation]
+        if len(influenced_variables) > 0:
+            structure.add_path([abbreviation], influenced_variables)
+
+    config = c.Config(structure.path(), scaled=False)
+    for abbreviation in abbreviations:
+        config.add_lv_with_columns_named(abbreviation, Mode.A, dataset, abbreviation)
+
+    return config
+
+
+# Het opzetten van de configuratie voor het plspm package: de paden tussen de kernvariabelen (op basis van de relaties
+# binnen het onderzoeksmodel) en per kernvariabele de bijbehorende items binnen de dataset.
+def build_config(dataset, corevariables, relations):
+    return config_from_paths(dataset, [corevariable.abbreviation for corevariable in corevariables],
+                             model_paths(corevariables, relations))
+
+
+# Het PLS-padmodel van een onderzoek, één keer geschat per verzoek. Alle ladingen, gewichten, padcoëfficiënten en de
+# daarvan afgeleide Composite Reliability en AVE per kernvariabele worden uit deze ene schatting gehaald.
+class AnalysisContext(object):
+    def __init__(self, dataset, corevariables, relations, scheme=Scheme.CENTROID):
+        self.dataset = dataset
+        self.corevariables = corevariables
+        self.scheme = scheme
+        self.config = build_config(dataset, corevariables, relations)
+
+        self.plspm_calc = Plspm(dataset, self.config, scheme)
+        self.outer_model = self.plspm_calc.outer_model()
+        self.loadings = self.outer_model['loading']
+        self.outer_weights = self.outer_model['weight']
+        self.path_coefficients = self.plspm_calc.path_coefficients()
+        self.scores = self.plspm_calc.scores()
+
+        # Dictionaries met de afkorting van de kernvariabele als key.
+        self.composite_reliability = {}
+        self.average_variance_extracted = {}
+        for corevariable in corevariables:
+            loadings = self.construct_loadings(corevariable.abbreviation)
+            self.composite_reliability[corevariable.abbreviation] = reliability.composite_reliability(loadings)
+            self.average_variance_extracted[corevariable.abbreviation] = \
+                reliability.average_variance_extracted(loadings)
+
+    def __repr__(self):
+        return '<Analysis context {}>'.format([corevariable.abbreviation for corevariable in self.corevariables])
+
+    # De ladingen van de items die bij de kernvariabele met de gegeven afkorting horen.
+    def construct_loadings(self, abbreviation):
+        items = list(self.loadings.index)
+        return [float(self.loadings[items[index]]) for index in reliability.construct_indexes(items, abbreviation)]
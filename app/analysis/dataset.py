@@ -0,0 +1,140 @@
+from hashlib import md5
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import func
+
+from app import db
+from app.analysis.questions import questionnaire_questions
+from app.analysis.responses import MISSING, materialize_responses, response_layout
+from app.analysis.snapshot import open_snapshot, write_snapshot
+from app.models import Answer, Case, CaseResponse, Question, QuestionGroup
+
+
+# Alle antwoorden op de vragen van de vragenlijst in één query als (case_id, question_id, score), gesorteerd op case.
+def answer_rows(questionnaire, completed_only=True):
+    query = db.session.query(Answer.case_id, Answer.question_id, Answer.score) \
+        .join(Question, Answer.question_id == Question.id) \
+        .join(QuestionGroup, Question.questiongroup_id == QuestionGroup.id) \
+        .join(Case, Answer.case_id == Case.id) \
+        .filter(QuestionGroup.questionnaire_id == questionnaire.id)
+    if completed_only:
+        query = query.filter(Case.completed == True)
+
+    return query.order_by(Answer.case_id, Answer.id).all()
+
+
+# Het omzetten van de antwoorden naar een matrix van cases (rijen) x vragen (kolommen). Een case zonder antwoord op een
+# vraag krijgt NaN op die plek.
+def pivot_answers(rows, question_ids):
+    rows = np.asarray(rows, dtype=np.float64).reshape(-1, 3)
+    case_ids = np.unique(rows[:, 0]).astype(np.int64)
+    columns = {question_id: column for column, question_id in enumerate(question_ids)}
+
+    # Antwoorden op vragen die (niet meer) in de vragenlijst staan worden overgeslagen. Heeft een case een vraag
+    # meerdere keren beantwoord (bijvoorbeeld door een dubbel verstuurde pagina), dan telt alleen het laatste antwoord.
+    known = np.array([int(question_id) in columns for question_id in rows[:, 1]], dtype=bool)
+    rows = rows[known]
+    matrix = np.full((len(case_ids), len(question_ids)), np.nan)
+    for case_index, column, score in zip(np.searchsorted(case_ids, rows[:, 0].astype(np.int64)),
+                                         [columns[int(question_id)] for question_id in rows[:, 1]], rows[:, 2]):
+        matrix[case_index, column] = score
+
+    return case_ids, matrix
+
+
+# De antwoorden van de voltooide cases uit de brede blobs (zie "app/analysis/responses.py"): de ontbrekende blobs worden
+# eerst gemaakt, waarna alle blobs met één query gelezen en in één keer naar een matrix van cases x vragen omgezet
+# worden. Net als bij "pivot_answers" telt een case zonder antwoorden niet mee. Met "last_response" worden alleen de
+# blobs tot en met dat ID gelezen.
+def response_matrix(questionnaire, question_ids, last_response=None):
+    materialize_responses(questionnaire.id)
+    query = db.session.query(CaseResponse.case_id, CaseResponse.scores) \
+        .filter_by(questionnaire_id=questionnaire.id, layout=response_layout(question_ids))
+    if last_response is not None:
+        query = query.filter(CaseResponse.id <= last_response)
+    rows = query.order_by(CaseResponse.case_id).all()
+
+    case_ids = np.array([case_id for (case_id, scores) in rows], dtype=np.int64)
+    scores = np.frombuffer(b''.join(scores for (case_id, scores) in rows), dtype='<i2') \
+        .reshape(len(rows), len(question_ids))
+    matrix = np.where(scores == MISSING, np.nan, scores)
+    answered = ~np.isnan(matrix).all(axis=1)
+
+    return case_ids[answered], matrix[answered]
+
+
+# Een fingerprint van de antwoorden waaruit de snapshot gemaakt wordt: de volgorde van de vragen (de layout van de
+# blobs), het aantal en het hoogste ID van de voltooide cases en het hoogste ID van de blobs met die layout. Een case
+# die tussendoor voltooid wordt, of een blob die opnieuw gemaakt wordt, geeft een andere fingerprint.
+def snapshot_fingerprint(questionnaire, question_ids):
+    layout = response_layout(question_ids)
+    cases = db.session.query(func.count(Case.id), func.max(Case.id)) \
+        .filter(Case.questionnaire_id == questionnaire.id, Case.completed == True).one()
+    response = db.session.query(func.max(CaseResponse.id)) \
+        .filter_by(questionnaire_id=questionnaire.id, layout=layout).scalar()
+    return md5(repr([layout, tuple(cases), response]).encode('utf-8')).hexdigest()
+
+
+# De snapshot van de vragenlijst (zie "app/analysis/snapshot.py") als deze nog bij de vragenlijst past: dezelfde vragen
+# en dezelfde fingerprint van de antwoorden als bij het schrijven. Anders None.
+def valid_snapshot(questionnaire, question_ids):
+    snapshot = open_snapshot(questionnaire.id)
+    if snapshot is None or snapshot.question_ids != list(question_ids):
+        return None
+    if snapshot.fingerprint != snapshot_fingerprint(questionnaire, question_ids):
+        return None
+    return snapshot
+
+
+# Het schrijven van de snapshot van de vragenlijst op basis van de brede blobs, bij het afronden van het onderzoek.
+# Geeft de snapshot, of None als de scores niet als int8 opgeslagen kunnen worden of het schrijven mislukt (de dataset
+# wordt dan gewoon uit de blobs gelezen).
+def save_snapshot(questionnaire):
+    questions = questionnaire_questions(questionnaire)
+    question_ids = [question.id for question in questions]
+    case_ids, matrix = response_matrix(questionnaire, question_ids)
+    try:
+        write_snapshot(questionnaire.id, question_ids, [question.question_code for question in questions], case_ids,
+                       matrix, snapshot_fingerprint(questionnaire, question_ids))
+        return open_snapshot(questionnaire.id)
+    except ValueError:
+        return None
+    except OSError:
+        current_app.logger.exception('Writing the snapshot of questionnaire %d failed', questionnaire.id)
+        return None
+
+
+# De dataset van de vragenlijst als Pandas Dataframe met de case-ID's als index en de codes van de vragen als kolommen.
+# Standaard worden alleen voltooide cases gebruikt. Met "missing" wordt bepaald wat er gebeurt met cases waarvan niet
+# alle vragen beantwoord zijn: "drop" verwijdert deze cases, "mean" vult de ontbrekende antwoorden in met het gemiddelde
+# van de vraag en "keep" laat de ontbrekende antwoorden als NaN staan.
+def load_dataset(questionnaire, completed_only=True, missing='drop'):
+    questions = questionnaire_questions(questionnaire)
+    question_ids = [question.id for question in questions]
+    # De voltooide cases komen uit de snapshot van een afgerond onderzoek (zonder kopie van de int8-scores, pas hier
+    # worden deze naar float64 omgezet) of anders uit de brede blobs; alleen voor de niet-voltooide cases zijn de losse
+    # antwoorden nodig.
+    snapshot = valid_snapshot(questionnaire, question_ids) if completed_only else None
+    if snapshot is not None:
+        case_ids = snapshot.case_ids
+        matrix = np.where(snapshot.scores == MISSING, np.nan, snapshot.scores)
+    elif completed_only:
+        case_ids, matrix = response_matrix(questionnaire, question_ids)
+    else:
+        case_ids, matrix = pivot_answers(answer_rows(questionnaire, completed_only), question_ids)
+
+    if missing == 'drop':
+        complete = ~np.isnan(matrix).any(axis=1)
+        case_ids, matrix = case_ids[complete], matrix[complete]
+    elif missing == 'mean':
+        answered = ~np.isnan(matrix)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            averages = np.where(answered, matrix, 0).sum(axis=0) / answered.sum(axis=0)
+        matrix = np.where(answered, matrix, averages)
+    elif missing != 'keep':
+        raise ValueError('Unknown way of handling missing answers: {}'.format(missing))
+
+    return pd.DataFrame(matrix, index=pd.Index(case_ids, name='case_id'),
+                        columns=[question.question_code for question in questions])
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from app.analysis.reliability import answer_matrix, construct_indexes, covariance_matrix
+
+
+# De correlatiematrix volgt direct uit de covariantiematrix (gelijk aan np.corrcoef).
+def correlations_from_covariances(covariances):
+    standard_deviations = np.sqrt(np.diag(covariances))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return covariances / np.outer(standard_deviations, standard_deviations)
+
+
+# De correlatiematrix van alle items, in één keer berekend.
+def correlation_matrix(matrix):
+    return correlations_from_covariances(covariance_matrix(matrix))
+
+
+# De Heterotrait-Monotrait ratio's van alle paren van kernvariabelen op basis van één correlatiematrix. "blocks" is een
+# lijst met per kernvariabele de kolomindexen van de items.
+def htmt_from_correlations(correlations, blocks):
+    # Een indicatormatrix (kernvariabelen x items) waarmee in één keer de sommen van alle blokken binnen de
+    # correlatiematrix bepaald worden.
+    indicator = np.zeros((len(blocks), correlations.shape[0]))
+    for row, indexes in enumerate(blocks):
+        indicator[row, indexes] = 1
+    block_sums = indicator @ correlations @ indicator.T
+    sizes = indicator.sum(axis=1)
+    # Items die binnen beide kernvariabelen vallen (bij een kernvariabele met zichzelf alle items). De correlatie van
+    # een item met zichzelf (altijd 1) telt niet mee in de gemiddelden.
+    shared = indicator @ indicator.T
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Het gemiddelde van de correlaties tussen de items van twee kernvariabelen (heterotrait), met op de diagonaal
+        # het gemiddelde van de correlaties tussen de eigen items van een kernvariabele (monotrait).
+        averages = (block_sums - shared) / (np.outer(sizes, sizes) - shared)
+        monotrait = np.diag(averages)
+        ratios = averages / np.sqrt(np.outer(monotrait, monotrait))
+    np.fill_diagonal(ratios, 1)
+
+    return ratios
+
+
+# Een Pandas Dataframe met de HTMT-ratios van alle paren van kernvariabelen (zowel de rijen als de kolommen zijn de
+# afkortingen van de kernvariabelen).
+def htmt_ratios(dataset, corevariables):
+    matrix, columns = answer_matrix(dataset)
+    blocks = [construct_indexes(columns, corevariable.abbreviation) for corevariable in corevariables]
+    abbreviations = [corevariable.abbreviation for corevariable in corevariables]
+
+    return pd.DataFrame(htmt_from_correlations(correlation_matrix(matrix), blocks), index=abbreviations,
+                        columns=abbreviations)
+
+
+# De HTMT-tabel zoals deze binnen de data-analyse getoond wordt: per kolom een kernvariabele, met alleen de waarden van
+# de kernvariabelen die in de rijen ervoor komen (zodat dezelfde waarden niet twee keer gegeven worden en de
+# HTMT-ratio van een kernvariabele met zichzelf, welke altijd 1 is, leeg blijft).
+def htmt_table(ratios):
+    abbreviations = list(ratios.columns)
+    data = {}
+    for column, abbreviation in enumerate(abbreviations):
+        data[abbreviation] = [round(float(ratios.iloc[row, column]), 4) if row < column else ' '
+                              for row in range(len(abbreviations))]
+
+    return pd.DataFrame(data, index=abbreviations)
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import AnalysisJob
+
+# Een wachtrij in de database voor de data-analyse op de achtergrond. De pagina's van de data-analyse zetten een
+# opdracht in de wachtrij (zie "analysis_or_job" in "app/new_study/analysis.py"), waarna "flask analysis worker" de
+# opdrachten één voor één uitvoert. Er is geen andere dienst (zoals een message broker) nodig.
+
+
+# De openstaande (wachtende of lopende) opdracht van het onderzoek, of een nieuwe opdracht als die er niet is.
+def enqueue_analysis(study):
+    job = AnalysisJob.query.filter(AnalysisJob.study_id == study.id,
+                                   AnalysisJob.status.in_(('queued', 'running'))).first()
+    if job is None:
+        job = AnalysisJob(study_id=study.id, status='queued', progress=0)
+        db.session.add(job)
+        db.session.commit()
+    return job
+
+
+# De laatste opdracht van het onderzoek, of None.
+def latest_job(study):
+    return AnalysisJob.query.filter_by(study_id=study.id).order_by(AnalysisJob.id.desc()).first()
+
+
+# Het oppakken van de oudste wachtende opdracht. Met een voorwaardelijke update wordt de status van "queued" naar
+# "running" gezet, zodat bij meerdere workers iedere opdracht maar door één worker opgepakt wordt. Geeft None als er
+# geen wachtende opdrachten zijn.
+def claim_job():
+    while True:
+        job_id = db.session.query(AnalysisJob.id).filter_by(status='queued').order_by(AnalysisJob.id).limit(1).scalar()
+        if job_id is None:
+            return None
+        claimed = AnalysisJob.query.filter_by(id=job_id, status='queued') \
+            .update({'status': 'running', 'started': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return AnalysisJob.query.get(job_id)
+
+
+def update_progress(job, progress):
+    job.progress = progress
+    db.session.commit()
+
+
+def finish_job(job):
+    job.status = 'finished'
+    job.progress = 100
+    job.finished = datetime.utcnow()
+    db.session.commit()
+
+
+def fail_job(job, error):
+    job.status = 'failed'
+    job.error = str(error)
+    job.finished = datetime.utcnow()
+    db.session.commit()
+
+
+# Opdrachten die langer dan "timeout" seconden lopen (bijvoorbeeld omdat de worker gestopt is) worden opnieuw in de
+# wachtrij gezet. Geeft het aantal opnieuw in de wachtrij gezette opdrachten.
+def requeue_stale_jobs(timeout):
+    requeued = AnalysisJob.query.filter(AnalysisJob.status == 'running',
+                                        AnalysisJob.started < datetime.utcnow() - timedelta(seconds=timeout)) \
+        .update({'status': 'queued', 'started': None, 'progress': 0}, synchronize_session=False)
+    db.session.commit()
+    return requeued
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from app.analysis.dataset import response_matrix
+from app.analysis.htmt import correlations_from_covariances, htmt_from_correlations, htmt_table
+from app.analysis.questions import questionnaire_questions
+from app.analysis.reliability import construct_indexes, cronbachs_alpha, total_variance
+from app.analysis.responses import materialize_responses, response_count, response_layout
+from app.analysis.running import load_statistics, save_statistics
+from app.models import Case
+
+# Het lezen van de lopende statistieken van een vragenlijst (zie "app/analysis/running.py") tijdens het onderzoek. Uit
+# het aantal cases n, de sommen S en de sommen van de producten P volgen de gemiddelden (S / n) en de
+# covariantiematrix ((n * P - S * S^T) / n², gelijk aan "covariance_matrix"). Dit kost O(items²), ongeacht het aantal
+# antwoorden.
+
+
+# De statistieken van de vragenlijst tijdens het onderzoek: de item codes, het aantal meegetelde cases, per item het
+# gemiddelde en de standaarddeviatie (steekproef), de correlatiematrix (Pandas Dataframe met de item codes als rijen en
+# kolommen), per kernvariabele Cronbach's Alpha en de HTMT-ratio's (Pandas Dataframe met de afkortingen).
+class LiveStatistics(object):
+    def __init__(self, items, count, means, standard_deviations, correlations, cronbachs_alphas, htmt_ratios):
+        self.items = items
+        self.count = count
+        self.means = means
+        self.standard_deviations = standard_deviations
+        self.correlations = correlations
+        self.cronbachs_alphas = cronbachs_alphas
+        self.htmt_ratios = htmt_ratios
+
+    def __repr__(self):
+        return '<Live statistics {} cases>'.format(self.count)
+
+    # De HTMT-tabel zoals deze binnen de data-analyse getoond wordt (zie "htmt_table").
+    def htmt_table(self):
+        return htmt_table(self.htmt_ratios)
+
+
+# Het opnieuw opbouwen van de lopende statistieken uit de antwoorden (de blobs), als er nog geen statistieken zijn of
+# als deze niet meer bij de vragenlijst passen. Alleen de blobs tot en met het hoogste ID op het moment van opbouwen
+# tellen mee, zodat een case die tussendoor voltooid wordt daarna precies één keer opgeteld wordt (zie "record_case").
+def rebuild_statistics(questionnaire, items):
+    materialize_responses(questionnaire.id)
+    cases, last_response = response_count(questionnaire.id, response_layout(items))
+    case_ids, matrix = response_matrix(questionnaire, items, last_response)
+    # Net als bij "load_dataset" (missing="drop") tellen alleen de cases die alle items beantwoord hebben.
+    matrix = matrix[~np.isnan(matrix).any(axis=1)].astype(np.int64)
+    return {'items': items, 'cases': cases, 'count': matrix.shape[0], 'sums': matrix.sum(axis=0).tolist(),
+            'products': (matrix.T @ matrix).tolist(), 'last_response': last_response}
+
+
+# De statistieken van de vragenlijst. Deze worden alleen opnieuw uit de antwoorden opgebouwd (en opgeslagen) als de
+# vragen, het aantal voltooide cases of het hoogste ID van de blobs niet overeenkomen met de opgeslagen statistieken,
+# zodat deze altijd kloppen met de antwoorden. Geeft None zolang er nog geen volledig ingevulde vragenlijsten zijn.
+def live_statistics(questionnaire, corevariables):
+    questions = questionnaire_questions(questionnaire)
+    items = [question.id for question in questions]
+    completed = Case.query.filter_by(questionnaire_id=questionnaire.id, completed=True).count()
+    last_response = response_count(questionnaire.id, response_layout(items))[1]
+
+    store, statistics = load_statistics(questionnaire.id)
+    if statistics is None or statistics['items'] != items or statistics['cases'] != completed \
+            or statistics['last_response'] != last_response:
+        statistics = rebuild_statistics(questionnaire, items)
+        save_statistics(questionnaire.id, statistics, store.version if store is not None else None)
+
+    count = statistics['count']
+    if count == 0:
+        return None
+
+    # De berekening met gehele getallen (int64) is exact; pas bij het delen ontstaan kommagetallen.
+    sums = np.asarray(statistics['sums'], dtype=np.int64)
+    products = np.asarray(statistics['products'], dtype=np.int64)
+    covariances = (count * products - np.outer(sums, sums)) / (count * count)
+    standard_deviations = np.sqrt(np.diag(covariances) * count / (count - 1)) if count > 1 \
+        else np.full(len(items), np.nan)
+    correlations = correlations_from_covariances(covariances)
+
+    codes = [question.question_code for question in questions]
+    blocks = [construct_indexes(codes, corevariable.abbreviation) for corevariable in corevariables]
+    abbreviations = [corevariable.abbreviation for corevariable in corevariables]
+    # Zolang de totaalscore van een kernvariabele geen variantie heeft (bijvoorbeeld bij één case) is Cronbach's Alpha
+    # niet gedefinieerd.
+    alphas = {abbreviation: cronbachs_alpha(covariances, indexes) if total_variance(covariances, indexes) > 0
+              else float('nan') for (abbreviation, indexes) in zip(abbreviations, blocks)}
+
+    return LiveStatistics(codes, count, dict(zip(codes, (sums / count).tolist())),
+                          dict(zip(codes, standard_deviations.tolist())),
+                          pd.DataFrame(correlations, index=codes, columns=codes), alphas,
+                          pd.DataFrame(htmt_from_correlations(correlations, blocks), index=abbreviations,
+                                       columns=abbreviations))
@@ -0,0 +1,149 @@
+import pandas as pd
+from flask import current_app
+
+from app.analysis import htmt, reliability
+from app.analysis.bootstrap import bootstrap
+from app.analysis.context import AnalysisContext, model_paths
+from app.analysis.dataset import load_dataset
+from app.analysis.vif import inner_vif_values_dict, outer_vif_values_dict
+from app.models import Relation
+
+# De volledige data-analyse van een onderzoek in één stap: de dataset, het geschatte PLS-padmodel en alle daarvan
+# afgeleide kwaliteitscriteria, samengebracht in één AnalysisResult. Zowel de data-analyse als de analyse per
+# kernvariabele tonen alleen (een deel van) dit resultaat, waardoor niets per pagina opnieuw berekend wordt. Een
+# AnalysisResult kan als dictionary (JSON) opgeslagen en daaruit weer opgebouwd worden (zie "app/analysis/cache.py").
+
+
+# De kwaliteitscriteria van één kernvariabele: Cronbach's Alpha, Composite Reliability en AVE, en de ladingen en
+# VIF-waarden van de items (dictionaries met de item code als key, in de volgorde van de items).
+class ConstructResult(object):
+    def __init__(self, abbreviation, cronbachs_alpha, composite_reliability, average_variance_extracted, loadings,
+                 outer_vif):
+        self.abbreviation = abbreviation
+        self.cronbachs_alpha = cronbachs_alpha
+        self.composite_reliability = composite_reliability
+        self.average_variance_extracted = average_variance_extracted
+        self.loadings = loadings
+        self.outer_vif = outer_vif
+
+    def __repr__(self):
+        return '<Construct result {}>'.format(self.abbreviation)
+
+    def items(self):
+        return list(self.loadings)
+
+
+# Het resultaat van de data-analyse. "abbreviations" geeft de volgorde van de kernvariabelen, "htmt_ratios" is een
+# Pandas Dataframe met de afkortingen als rijen en kolommen, "inner_vif" bevat per beïnvloede kernvariabele de
+# binnenste VIF-waarden van de kernvariabelen die deze beïnvloeden en "bootstrap" bevat (alleen met
+# BOOTSTRAP_SAMPLES en ANALYSIS_JOBS) de gebootstrapte padcoëfficiënten en HTMT-ratio's. De dataset en het geschatte
+# model ("context") zijn alleen aanwezig direct na het berekenen, niet bij een opgeslagen resultaat.
+class AnalysisResult(object):
+    def __init__(self, abbreviations, loadings, reliability_data, htmt_ratios, outer_vif, inner_vif,
+                 bootstrap_data=None, dataset=None, context=None):
+        self.abbreviations = abbreviations
+        self.loadings = loadings
+        self.reliability = reliability_data
+        self.htmt_ratios = htmt_ratios
+        self.outer_vif = outer_vif
+        self.inner_vif = inner_vif
+        self.bootstrap = bootstrap_data
+        self.dataset = dataset
+        self.context = context
+
+        self.constructs = {}
+        items = list(loadings)
+        for abbreviation in abbreviations:
+            construct_items = [items[index] for index in reliability.construct_indexes(items, abbreviation)]
+            self.constructs[abbreviation] = ConstructResult(
+                abbreviation, reliability_data[abbreviation]['cronbachs_alpha'],
+                reliability_data[abbreviation]['composite_reliability'],
+                reliability_data[abbreviation]['average_variance_extracted'],
+                {item: loadings[item] for item in construct_items},
+                {item: outer_vif[item] for item in construct_items if item in outer_vif})
+
+    def __repr__(self):
+        return '<Analysis result {}>'.format(self.abbreviations)
+
+    def construct(self, abbreviation):
+        return self.constructs[abbreviation]
+
+    def htmt_ratio(self, first, second):
+        return float(self.htmt_ratios.loc[first, second])
+
+    # De HTMT-ratio's in de volgorde van de gegeven afkortingen.
+    def htmt_matrix(self, abbreviations):
+        return self.htmt_ratios.loc[abbreviations, abbreviations]
+
+    # De HTMT-tabel zoals deze binnen de data-analyse getoond wordt (zie "htmt_table").
+    def htmt_table(self, abbreviations):
+        return htmt.htmt_table(self.htmt_matrix(abbreviations))
+
+    # Het resultaat als dictionary welke als JSON opgeslagen kan worden.
+    def to_dict(self):
+        results = {'loadings': self.loadings,
+                   'reliability': self.reliability,
+                   'htmt': {'abbreviations': list(self.htmt_ratios.columns),
+                            'ratios': self.htmt_ratios.values.tolist()},
+                   'outer_vif': self.outer_vif,
+                   'inner_vif': self.inner_vif}
+        if self.bootstrap is not None:
+            results['bootstrap'] = self.bootstrap
+        return results
+
+    @classmethod
+    def from_dict(cls, results):
+        abbreviations = results['htmt']['abbreviations']
+        htmt_ratios = pd.DataFrame(results['htmt']['ratios'], index=abbreviations, columns=abbreviations)
+        return cls(abbreviations, results['loadings'], results['reliability'], htmt_ratios, results['outer_vif'],
+                   results['inner_vif'], results.get('bootstrap'))
+
+
+# De statistieken van het bootstrappen (zie "app/analysis/bootstrap.py") als lijst met dictionaries (met de naam van het
+# pad of het paar van kernvariabelen onder "name"), zodat deze samen met de overige resultaten opgeslagen kunnen worden.
+def bootstrap_rows(statistics):
+    return [dict({'name': name}, **{column: float(value) for (column, value) in row.items()})
+            for (name, row) in statistics.iterrows()]
+
+
+# Het volledig uitvoeren van de data-analyse: de dataset wordt één keer geladen en het PLS-padmodel één keer geschat,
+# waarna alle kwaliteitscriteria daaruit volgen. Met "progress" kan de voortgang (een percentage) na iedere stap
+# doorgegeven worden. Er wordt alleen gebootstrapt met "bootstrap_samples" (zie "analysis_bootstrap_samples").
+def run_pipeline(questionnaire, model, corevariables, progress=None, bootstrap_samples=0):
+    report = progress or (lambda percentage: None)
+    dataset = load_dataset(questionnaire)
+    report(20)
+    relations = [relation for relation in Relation.query.filter_by(model_id=model.id)]
+    context = AnalysisContext(dataset, corevariables, relations)
+    report(60)
+    data_reliability = reliability.reliability_table(dataset, corevariables)
+    ratios = htmt.htmt_ratios(dataset, corevariables)
+    report(80)
+
+    results_reliability = {}
+    for corevariable in corevariables:
+        results_reliability[corevariable.abbreviation] = {
+            'cronbachs_alpha': data_reliability[corevariable.abbreviation]['cronbachs_alpha'],
+            'composite_reliability': context.composite_reliability[corevariable.abbreviation],
+            'average_variance_extracted': context.average_variance_extracted[corevariable.abbreviation]}
+
+    # Met "bootstrap_samples" ook de significantie van de padcoëfficiënten en de betrouwbaarheidsintervallen van de
+    # HTMT-ratio's (het grootste deel van de rekentijd). Het oorspronkelijke model is hierboven al geschat.
+    bootstrap_data = None
+    config = current_app.config
+    if bootstrap_samples > 0:
+        bootstrap_results = bootstrap(dataset, corevariables, relations, samples=bootstrap_samples,
+                                      workers=config['BOOTSTRAP_WORKERS'], seed=config['BOOTSTRAP_SEED'],
+                                      confidence=config['BOOTSTRAP_CONFIDENCE'],
+                                      progress=lambda done, total: report(80 + 19 * done // total),
+                                      path_coefficients=context.path_coefficients)
+        bootstrap_data = {'samples': bootstrap_results.samples, 'valid': bootstrap_results.valid,
+                          'confidence': bootstrap_results.confidence,
+                          'paths': bootstrap_rows(bootstrap_results.paths),
+                          'htmt': bootstrap_rows(bootstrap_results.htmt)}
+
+    return AnalysisResult([corevariable.abbreviation for corevariable in corevariables],
+                          {code: float(loading) for (code, loading) in context.loadings.items()},
+                          results_reliability, ratios, outer_vif_values_dict(dataset, questionnaire),
+                          inner_vif_values_dict(context.scores, model_paths(corevariables, relations)),
+                          bootstrap_data, dataset, context)
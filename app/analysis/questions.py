@@ -0,0 +1,11 @@
+from app.models import Question, QuestionGroup
+
+# De vragen van een vragenlijst zonder de rekenmodules (numpy en pandas) te laden, zodat ook de pagina's zonder analyse
+# (zoals de samenvatting van de resultaten) deze kunnen gebruiken.
+
+
+# Alle vragen binnen de vragenlijst in één query, in de volgorde van de vragengroepen.
+def questionnaire_questions(questionnaire):
+    return Question.query.join(QuestionGroup, Question.questiongroup_id == QuestionGroup.id) \
+        .filter(QuestionGroup.questionnaire_id == questionnaire.id) \
+        .order_by(QuestionGroup.id, Question.id).all()
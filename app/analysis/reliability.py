@@ -0,0 +1,73 @@
+import numpy as np
+
+
+# Het omzetten van de dataset (Pandas Dataframe met de item codes als kolommen) naar één float64-matrix en een lijst met
+# de bijbehorende item codes.
+def answer_matrix(dataset):
+    return np.asarray(dataset, dtype=np.float64), [str(column) for column in dataset.columns]
+
+
+# De kolomindexen van de items die bij een kernvariabele horen (de items waarvan de code met de afkorting begint, zoals
+# "PE1" en "PE2" bij "PE").
+def construct_indexes(columns, abbreviation):
+    return [index for index, column in enumerate(columns) if column[:len(abbreviation)] == abbreviation]
+
+
+# De covariantiematrix van alle items in één keer. Net als bij de oorspronkelijke berekeningen wordt gedeeld door het
+# aantal cases (populatie) en niet door het aantal cases min één.
+def covariance_matrix(matrix):
+    deviations = matrix - matrix.mean(axis=0)
+    return deviations.T @ deviations / matrix.shape[0]
+
+
+# De variantie van de totaalscore (per case de scores van de items opgeteld) is de som van het blok binnen de
+# covariantiematrix.
+def total_variance(covariances, indexes):
+    return float(covariances[np.ix_(indexes, indexes)].sum())
+
+
+def cronbachs_alpha(covariances, indexes):
+    total_items = len(indexes)
+    # Bij één item is Cronbach's Alpha niet gedefinieerd.
+    if total_items < 2:
+        return float('nan')
+    variance_total_column = total_variance(covariances, indexes)
+    sum_variance_questions = float(covariances[indexes, indexes].sum())
+
+    return (total_items / (total_items - 1)) * (
+            (variance_total_column - sum_variance_questions) / variance_total_column)
+
+
+# De betrouwbaarheid van alle kernvariabelen in één keer: een dictionary met per afkorting de items, de varianties van
+# de items, de variantie van de totaalscore en Cronbach's Alpha. De covariantiematrix wordt slechts één keer berekend.
+def reliability_table(dataset, corevariables):
+    matrix, columns = answer_matrix(dataset)
+    covariances = covariance_matrix(matrix)
+
+    table = {}
+    for corevariable in corevariables:
+        indexes = construct_indexes(columns, corevariable.abbreviation)
+        table[corevariable.abbreviation] = {
+            'items': [columns[index] for index in indexes],
+            'item_variances': [float(covariances[index, index]) for index in indexes],
+            'total_variance': total_variance(covariances, indexes),
+            'cronbachs_alpha': cronbachs_alpha(covariances, indexes)}
+
+    return table
+
+
+# Composite Reliability op basis van de ladingen van de items van één kernvariabele.
+def composite_reliability(loadings):
+    loadings = np.asarray(loadings, dtype=np.float64)
+    # De errors zijn één min de gekwadrateerde ladingen.
+    squared_sum = loadings.sum() * loadings.sum()
+    errors = (1 - loadings * loadings).sum()
+
+    return float(squared_sum / (squared_sum + errors))
+
+
+# Average Variance Extracted: het gemiddelde van de gekwadrateerde ladingen van de items van één kernvariabele.
+def average_variance_extracted(loadings):
+    loadings = np.asarray(loadings, dtype=np.float64)
+
+    return float((loadings * loadings).mean())
@@ -0,0 +1,86 @@
+import struct
+from hashlib import md5
+
+from sqlalchemy import and_, func
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Answer, Case, CaseResponse, Question, QuestionGroup
+
+# De antwoorden van de voltooide cases in "brede" vorm (CaseResponse): per case één blob met de scores van alle vragen
+# als SmallInteger (little-endian int16), in de volgorde van de vragenlijst. Een vraag zonder antwoord krijgt MISSING.
+# De blob wordt bij het versturen van de vragenlijst samen met de antwoorden opgeslagen (zie "submit_case"); voor cases
+# die (nog) geen blob hebben, of een blob met een andere volgorde van de vragen, wordt deze bij het beëindigen van het
+# onderzoek of het laden van de dataset uit de antwoorden gemaakt (zie "materialize_responses"). Het antwoord van een
+# voltooide case verandert daarna niet meer. Deze module laadt geen rekenmodules; het lezen gebeurt in "load_dataset".
+MISSING = -1
+
+
+# De ID's van alle vragen binnen de vragenlijst, in de volgorde van de vragengroepen (zie "questionnaire_questions").
+def questionnaire_items(questionnaire_id):
+    return [question_id for (question_id,) in db.session.query(Question.id)
+            .join(QuestionGroup, Question.questiongroup_id == QuestionGroup.id)
+            .filter(QuestionGroup.questionnaire_id == questionnaire_id).order_by(QuestionGroup.id, Question.id)]
+
+
+# Een hash van de volgorde van de vraag-ID's, zodat een blob alleen gelezen wordt met dezelfde vragen.
+def response_layout(items):
+    return md5(repr([int(item) for item in items]).encode('utf-8')).hexdigest()
+
+
+# De scores van één case ("answers" is een dictionary met vraag-ID en score) als blob.
+def encode_scores(items, answers):
+    answers = {int(question_id): score for (question_id, score) in answers.items()}
+    return struct.pack('<{}h'.format(len(items)), *[int(answers.get(item, MISSING)) for item in items])
+
+
+# Het toevoegen van de blob van een case aan de huidige transactie (zonder commit). Geeft het ID van de blob.
+def add_case_response(case_id, questionnaire_id, items, answers):
+    response = {'case_id': case_id, 'questionnaire_id': questionnaire_id, 'layout': response_layout(items),
+                'scores': encode_scores(items, answers)}
+    db.session.bulk_insert_mappings(CaseResponse, [response], return_defaults=True)
+    return response['id']
+
+
+# Het aantal blobs van de vragenlijst met de gegeven volgorde van de vragen en het hoogste ID daarvan (0 zonder blobs).
+def response_count(questionnaire_id, layout):
+    count, last_response = db.session.query(func.count(CaseResponse.id), func.max(CaseResponse.id)) \
+        .filter_by(questionnaire_id=questionnaire_id, layout=layout).one()
+    return count, last_response or 0
+
+
+# Een query op de voltooide cases van de vragenlijst die nog geen blob met de huidige volgorde van de vragen hebben,
+# met het gegeven (zoals Case.id) als kolom.
+def unmaterialized_cases(questionnaire_id, layout, *columns):
+    return db.session.query(*columns).select_from(Case) \
+        .outerjoin(CaseResponse, and_(CaseResponse.case_id == Case.id, CaseResponse.layout == layout)) \
+        .filter(Case.questionnaire_id == questionnaire_id, Case.completed == True, CaseResponse.id == None)
+
+
+# Het maken van de ontbrekende blobs uit de antwoorden. Blobs met een andere volgorde van de vragen worden vervangen.
+# Maakt een gelijktijdig verstuurde vragenlijst tussendoor zelf een blob, dan wordt het opnieuw geprobeerd. Geeft het
+# aantal gemaakte blobs.
+def materialize_responses(questionnaire_id):
+    items = questionnaire_items(questionnaire_id)
+    layout = response_layout(items)
+    answers = {case_id: {} for (case_id,) in unmaterialized_cases(questionnaire_id, layout, Case.id)}
+    if not answers:
+        return 0
+
+    # Bij een dubbel antwoord op een vraag telt het laatste antwoord (net als in "pivot_answers").
+    rows = unmaterialized_cases(questionnaire_id, layout, Answer.case_id, Answer.question_id, Answer.score) \
+        .join(Answer, Answer.case_id == Case.id).order_by(Answer.id)
+    for (case_id, question_id, score) in rows.yield_per(1000):
+        answers[case_id][question_id] = score
+
+    CaseResponse.query.filter(CaseResponse.questionnaire_id == questionnaire_id, CaseResponse.layout != layout) \
+        .delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(CaseResponse, [
+        {'case_id': case_id, 'questionnaire_id': questionnaire_id, 'layout': layout,
+         'scores': encode_scores(items, case_answers)} for (case_id, case_answers) in answers.items()])
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return materialize_responses(questionnaire_id)
+    return len(answers)
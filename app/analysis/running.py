@@ -0,0 +1,109 @@
+import json
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app import db
+from app.models import QuestionnaireStatistics
+
+# De lopende statistieken van een vragenlijst tijdens het onderzoek (stage_2): per item het aantal, de som van de scores
+# en per paar van items de som van de producten. Bij het versturen van een vragenlijst worden alleen de scores van die
+# case opgeteld, waarna de gemiddelden, de covariantiematrix en alles wat daaruit volgt (correlaties, Cronbach's Alpha
+# en HTMT) op ieder moment zonder de antwoorden opnieuw te lezen berekend kunnen worden (zie "app/analysis/live.py").
+# De scores zijn gehele getallen, waardoor de sommen (Python ints) exact blijven en de volgorde van het optellen niet
+# uitmaakt. Iedere case wordt herkend aan het ID van de blob met de antwoorden (CaseResponse, aangemaakt bij het
+# voltooien, zie "app/analysis/responses.py"): de statistieken bevatten het hoogste meegetelde ID ("last_response"),
+# zodat een case die al bij het opnieuw opbouwen meegeteld is niet nog een keer opgeteld wordt. Deze module laadt geen
+# rekenmodules, zodat het versturen van de vragenlijst licht blijft.
+
+# Het maximale aantal pogingen bij gelijktijdige wijzigingen van de statistieken.
+RECORD_ATTEMPTS = 5
+
+
+# Lege statistieken voor de gegeven vraag-ID's.
+def empty_statistics(items):
+    return {'items': list(items), 'cases': 0, 'count': 0, 'sums': [0] * len(items),
+            'products': [[0] * len(items) for item in items], 'last_response': 0}
+
+
+# Het optellen van één voltooide case ("answers" is een dictionary met vraag-ID en score, "response_id" het ID van de
+# blob van de case). Alleen een case die alle items beantwoord heeft telt mee in de sommen, net als bij "load_dataset"
+# (missing="drop").
+def add_case(statistics, response_id, answers):
+    answers = {int(question_id): score for (question_id, score) in answers.items()}
+    statistics['cases'] += 1
+    statistics['last_response'] = max(statistics['last_response'], response_id)
+    if any(item not in answers for item in statistics['items']):
+        return statistics
+
+    scores = [int(answers[item]) for item in statistics['items']]
+    statistics['count'] += 1
+    for (row, score) in enumerate(scores):
+        statistics['sums'][row] += score
+        products = statistics['products'][row]
+        for (column, other) in enumerate(scores):
+            products[column] += score * other
+    return statistics
+
+
+# De opgeslagen statistieken van de vragenlijst als (rij, statistieken), of (None, None) als er (nog) geen zijn.
+def load_statistics(questionnaire_id):
+    store = QuestionnaireStatistics.query.filter_by(questionnaire_id=questionnaire_id).first()
+    if store is None:
+        return None, None
+    return store, {'items': json.loads(store.items), 'cases': store.cases, 'count': store.count,
+                   'sums': json.loads(store.sums), 'products': json.loads(store.products),
+                   'last_response': store.last_response or 0}
+
+
+# Het opslaan van de statistieken met een voorwaardelijke update: alleen als de rij nog de gelezen versie heeft
+# ("version", None voor een nieuwe rij). Geeft False als een ander verzoek de statistieken tussendoor gewijzigd heeft.
+def save_statistics(questionnaire_id, statistics, version):
+    values = {'items': json.dumps(statistics['items']), 'cases': statistics['cases'], 'count': statistics['count'],
+              'sums': json.dumps(statistics['sums']), 'products': json.dumps(statistics['products']),
+              'last_response': statistics['last_response'], 'updated': datetime.utcnow()}
+    if version is None:
+        db.session.add(QuestionnaireStatistics(questionnaire_id=questionnaire_id, version=0, **values))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+        return True
+
+    saved = QuestionnaireStatistics.query.filter_by(questionnaire_id=questionnaire_id, version=version) \
+        .update(dict(values, version=version + 1), synchronize_session=False)
+    db.session.commit()
+    return bool(saved)
+
+
+# Het bijwerken van de statistieken na het versturen van een vragenlijst. Zijn er (nog) geen statistieken, bijvoorbeeld
+# bij een onderzoek dat gestart is voordat deze bestonden, of is de case al meegeteld (bij het opnieuw opbouwen na het
+# voltooien), dan gebeurt niets. Bij een gelijktijdige wijziging wordt het opnieuw geprobeerd met de nieuwe versie, tot
+# RECORD_ATTEMPTS keer. De antwoorden zelf zijn dan al opgeslagen: lukt het bijwerken niet, dan kloppen de aantallen
+# niet meer en worden de statistieken bij het lezen opnieuw opgebouwd (zie "live_statistics"). Geeft aan of de case
+# opgeteld is.
+def record_case(questionnaire_id, response_id, answers):
+    try:
+        for attempt in range(RECORD_ATTEMPTS):
+            store, statistics = load_statistics(questionnaire_id)
+            if store is None or response_id <= statistics['last_response']:
+                return False
+            if save_statistics(questionnaire_id, add_case(statistics, response_id, answers), store.version):
+                return True
+    except SQLAlchemyError:
+        db.session.rollback()
+        current_app.logger.exception('Updating the statistics of questionnaire %d failed', questionnaire_id)
+        return False
+
+    current_app.logger.warning('Updating the statistics of questionnaire %d failed after %d attempts', questionnaire_id,
+                               RECORD_ATTEMPTS)
+    return False
+
+
+# Het (opnieuw) beginnen van de statistieken van de vragenlijst met de gegeven vraag-ID's, bij het starten van het
+# onderzoek.
+def reset_statistics(questionnaire_id, items):
+    store = QuestionnaireStatistics.query.filter_by(questionnaire_id=questionnaire_id).first()
+    return save_statistics(questionnaire_id, empty_statistics(items), store.version if store is not None else None)
@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from flask import current_app
+
+from app.analysis.responses import MISSING
+
+# Een onveranderlijke snapshot van de antwoorden van een afgerond onderzoek op schijf, per vragenlijst een map binnen
+# SNAPSHOT_FOLDER met:
+#   - scores.npy: de antwoordmatrix (cases x vragen) als int8, met MISSING voor een ontbrekend antwoord;
+#   - cases.npy: de case-ID's van de rijen (oplopend);
+#   - questions.json: de ID's en codes van de vragen (de kolommen) en de fingerprint van de antwoorden bij het schrijven
+#     (zie "snapshot_fingerprint" in "app/analysis/dataset.py").
+# De matrices worden met np.load(mmap_mode='r') geopend: er wordt niets gekopieerd en alle processen die dezelfde
+# snapshot lezen delen de pagina's ervan via het besturingssysteem.
+
+# Een cache binnen het proces met de geopende snapshots per map, met het tijdstip van schrijven zodat een nieuwe
+# snapshot opnieuw geopend wordt.
+snapshots = {}
+
+
+# Een geopende snapshot. "scores" en "case_ids" zijn alleen-lezen numpy memmaps.
+class Snapshot(object):
+    def __init__(self, scores, case_ids, question_ids, question_codes, fingerprint):
+        self.scores = scores
+        self.case_ids = case_ids
+        self.question_ids = question_ids
+        self.question_codes = question_codes
+        self.fingerprint = fingerprint
+
+    def __repr__(self):
+        return '<Snapshot {} cases x {} questions>'.format(self.scores.shape[0], self.scores.shape[1])
+
+    # De scores van de gegeven cases als dictionary met per case-ID een lijst (None voor een ontbrekend antwoord).
+    # Cases die niet in de snapshot staan worden overgeslagen.
+    def case_scores(self, case_ids):
+        case_ids = np.asarray(case_ids, dtype=np.int64)
+        positions = np.searchsorted(self.case_ids, case_ids)
+        found = positions < len(self.case_ids)
+        found[found] = self.case_ids[positions[found]] == case_ids[found]
+        return {int(case_id): [None if score == MISSING else score for score in row]
+                for (case_id, row) in zip(case_ids[found], self.scores[positions[found]].tolist())}
+
+
+def snapshot_directory(questionnaire_id):
+    return os.path.join(current_app.config['SNAPSHOT_FOLDER'], 'questionnaire_{}'.format(questionnaire_id))
+
+
+# Het schrijven van de snapshot van de vragenlijst. De bestanden worden eerst in een tijdelijke map geschreven die
+# daarna (vrijwel) in één keer de plaats van een eventuele eerdere snapshot inneemt; processen die de eerdere snapshot
+# nog open hebben kunnen deze blijven lezen. "matrix" bevat de scores als float64 (NaN voor een ontbrekend antwoord).
+# De eigen geopende snapshot wordt vóór het vervangen uit de cache gehaald: onder Windows kan een map met een geopende
+# memmap niet vervangen worden.
+def write_snapshot(questionnaire_id, question_ids, question_codes, case_ids, matrix, fingerprint):
+    scores = np.where(np.isnan(matrix), MISSING, matrix)
+    if scores.size and (scores.min() < MISSING or scores.max() > np.iinfo(np.int8).max):
+        raise ValueError('Scores do not fit in an int8 snapshot')
+
+    directory = snapshot_directory(questionnaire_id)
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    temporary = tempfile.mkdtemp(prefix='.questionnaire_{}_'.format(questionnaire_id), dir=os.path.dirname(directory))
+    np.save(os.path.join(temporary, 'scores.npy'), scores.astype(np.int8))
+    np.save(os.path.join(temporary, 'cases.npy'), np.asarray(case_ids, dtype=np.int64))
+    with open(os.path.join(temporary, 'questions.json'), 'w') as handle:
+        json.dump({'ids': list(question_ids), 'codes': list(question_codes), 'fingerprint': fingerprint}, handle)
+
+    snapshots.pop(directory, None)
+    if os.path.exists(directory):
+        previous = tempfile.mkdtemp(prefix='.questionnaire_{}_'.format(questionnaire_id),
+                                    dir=os.path.dirname(directory))
+        os.replace(directory, os.path.join(previous, 'snapshot'))
+        os.replace(temporary, directory)
+        shutil.rmtree(previous, ignore_errors=True)
+    else:
+        os.replace(temporary, directory)
+
+
+# De snapshot van de vragenlijst, of None als er geen is. Een al geopende snapshot wordt hergebruikt zolang deze niet
+# opnieuw geschreven is.
+def open_snapshot(questionnaire_id):
+    directory = snapshot_directory(questionnaire_id)
+    path = os.path.join(directory, 'questions.json')
+    try:
+        written = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    cached = snapshots.get(directory)
+    if cached is not None and cached[0] == written:
+        return cached[1]
+
+    with open(path) as handle:
+        questions = json.load(handle)
+    snapshot = Snapshot(np.load(os.path.join(directory, 'scores.npy'), mmap_mode='r'),
+                        np.load(os.path.join(directory, 'cases.npy'), mmap_mode='r'), questions['ids'],
+                        questions['codes'], questions.get('fingerprint'))
+    snapshots[directory] = (written, snapshot)
+    return snapshot
@@ -0,0 +1,58 @@
+from itertools import groupby
+
+import numpy as np
+
+from app.analysis.dataset import questionnaire_questions
+from app.analysis.htmt import correlation_matrix
+from app.analysis.reliability import answer_matrix
+
+# De Variance Inflation Factors (VIF) van de items binnen iedere kernvariabele (buitenste VIF) en van de kernvariabelen
+# die samen een andere kernvariabele beïnvloeden (binnenste VIF). De VIF van een kolom is 1 / (1 - R²) van de regressie
+# (met constante) van die kolom op de overige kolommen van het blok; dit is gelijk aan de diagonaal van de inverse van
+# de correlatiematrix van het blok. Per blok is daardoor één kleine matrixinversie nodig in plaats van een regressie
+# per kolom.
+
+
+# De VIF-waarden van alle kolommen van een matrix (cases x kolommen) als numpy array. Bij perfecte multicollineariteit
+# (een singuliere correlatiematrix) zijn alle VIF-waarden van het blok oneindig.
+def block_vif(matrix):
+    correlations = correlation_matrix(matrix)
+    try:
+        return np.diag(np.linalg.inv(correlations))
+    except np.linalg.LinAlgError:
+        return np.full(matrix.shape[1], np.inf)
+
+
+# De codes van alle vragen binnen de vragenlijst in één query, verdeeld in lijsten per vragengroep (kernvariabele).
+def questionnaire_blocks(questionnaire):
+    return [[question.question_code for question in questions] for (questiongroup_id, questions) in
+            groupby(questionnaire_questions(questionnaire), key=lambda question: question.questiongroup_id)]
+
+
+# Een dictionary met de items en de bijbehorende buitenste VIF-waarde (afgerond op vier decimalen), per vragengroep in
+# de volgorde van de vragen.
+def outer_vif_values_dict(dataset, questionnaire):
+    matrix, columns = answer_matrix(dataset)
+    column_indexes = {column: index for (index, column) in enumerate(columns)}
+
+    data_outer_vif = {}
+    for block in questionnaire_blocks(questionnaire):
+        values = block_vif(matrix[:, [column_indexes[code] for code in block]])
+        for (code, value) in zip(block, values):
+            data_outer_vif[code] = round(float(value), 4)
+
+    return data_outer_vif
+
+
+# De binnenste VIF-waarden op basis van de scores van de kernvariabelen (Pandas Dataframe met de afkortingen als
+# kolommen): per beïnvloede kernvariabele een dictionary met de VIF-waarde van iedere kernvariabele die deze beïnvloedt.
+# "paths" is een lijst met (afkorting beïnvloedende, afkorting beïnvloede kernvariabele), zie "model_paths".
+def inner_vif_values_dict(scores, paths):
+    data_inner_vif = {}
+    for influenced in dict.fromkeys(influenced for (influencer, influenced) in paths):
+        influencers = [influencer for (influencer, target) in paths if target == influenced]
+        values = block_vif(np.asarray(scores[influencers], dtype=np.float64))
+        data_inner_vif[influenced] = {influencer: round(float(value), 4)
+                                      for (influencer, value) in zip(influencers, values)}
+
+    return data_inner_vif
@@ -1,7 +1,13 @@
 import os
+import time
 
 import click
 
+from app import db
+from app.analysis.jobs import claim_job, requeue_stale_jobs
+from app.models import User
+from app.sessions import collect_expired_sessions
+
 
 def register(app):
     @app.cli.group()
@@ -34,3 +40,74 @@ def register(app):
         """Compile all languages."""
         if os.system('pybabel compile -d app/translations'):
             raise RuntimeError('compile command failed')
+
+    @app.cli.group()
+    def sessions():
+        """Session management commands."""
+        pass
+
+    @sessions.command()
+    def gc():
+        """Remove all expired sessions."""
+        removed = collect_expired_sessions(app)
+        click.echo('Removed {} expired session(s).'.format(removed))
+
+    @app.cli.group()
+    def synthetic():
+        """Synthetic data commands."""
+        pass
+
+    @synthetic.command()
+    @click.option('--name', default=None, help='Name of the study (default: a random name).')
+    @click.option('--corevariables', default=6, show_default=True, help='Number of core variables.')
+    @click.option('--items', default=4, show_default=True, help='Number of items per core variable.')
+    @click.option('--cases', default=500, show_default=True, help='Number of completed cases.')
+    @click.option('--demographics', default=2, show_default=True, help='Number of demographics.')
+    @click.option('--loading', default=0.8, show_default=True, help='Loading of every item on its core variable.')
+    @click.option('--path', default=0.5, show_default=True, help='Path coefficient between consecutive core variables.')
+    @click.option('--scale', default=5, show_default=True, help='Scale of the questionnaire.')
+    @click.option('--stage', default=3, show_default=True, type=click.IntRange(1, 3), help='Stage of the study.')
+    @click.option('--user', 'username', default=None, help='Username of the researcher to link to the study.')
+    @click.option('--seed', default=None, type=int, help='Seed of the random answers.')
+    def study(name, corevariables, items, cases, demographics, loading, path, scale, stage, username, seed):
+        """Generate a synthetic study with correlated answers."""
+        from app.synthetic import generate_study
+        user = None
+        if username is not None:
+            user = User.query.filter_by(username=username).first()
+            if user is None:
+                raise click.BadParameter('unknown user {}'.format(username), param_hint='--user')
+        new_study = generate_study(name=name, corevariables=corevariables, items=items, cases=cases,
+                                   demographics=demographics, loading=loading, path=path, scale=scale, stage=stage,
+                                   user=user, seed=seed)
+        click.echo('Generated study "{}" ({}) with {} cases.'.format(new_study.name, new_study.code, cases))
+
+    @app.cli.group()
+    def analysis():
+        """Data-analysis commands."""
+        pass
+
+    @analysis.command()
+    @click.option('--interval', default=2.0, show_default=True, help='Seconds to wait when the queue is empty.')
+    @click.option('--once', is_flag=True, help='Stop as soon as the queue is empty.')
+    def worker(interval, once):
+        """Run the queued data-analysis jobs."""
+        from app.new_study.analysis import run_analysis_job
+        while True:
+            requeued = requeue_stale_jobs(app.config['ANALYSIS_JOB_TIMEOUT'])
+            if requeued:
+                click.echo('Requeued {} stale job(s).'.format(requeued))
+
+            job = claim_job()
+            if job is None:
+                if once:
+                    return
+                time.sleep(interval)
+                continue
+
+            click.echo('Running job {} (study {}).'.format(job.id, job.study_id))
+            if run_analysis_job(job):
+                click.echo('Finished job {}.'.format(job.id))
+            else:
+                click.echo('Job {} failed: {}'.format(job.id, job.error))
+            db.session.remove()
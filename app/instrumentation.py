@@ -0,0 +1,154 @@
+import heapq
+import time
+from collections import deque
+from threading import Lock
+
+from flask import g, request, has_request_context, request_started, request_finished
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Het (optioneel) meten van ieder verzoek: het aantal queries, de totale tijd binnen SQL, de traagste statements en de
+# tijd binnen Python (de totale tijd min de tijd binnen SQL). Aan te zetten met INSTRUMENTATION. Per verzoek wordt een
+# regel naar de log van de applicatie geschreven; de totalen per endpoint en de laatste verzoeken staan op
+# "/admin/metrics" (zie "app/admin/routes.py").
+
+
+# De totalen van alle gemeten verzoeken naar één endpoint, met de traagste statements (als (duur, statement)).
+class EndpointMetrics(object):
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.sql_time = 0.0
+        self.total_time = 0.0
+        self.slowest = []
+
+    def __repr__(self):
+        return '<Endpoint metrics {}>'.format(self.endpoint)
+
+    def add(self, measurement, slowest):
+        self.requests += 1
+        self.queries += measurement.queries
+        self.max_queries = max(self.max_queries, measurement.queries)
+        self.sql_time += measurement.sql_time
+        self.total_time += measurement.total_time
+        for statement in measurement.statements:
+            if len(self.slowest) < slowest:
+                heapq.heappush(self.slowest, statement)
+            elif statement > self.slowest[0]:
+                heapq.heapreplace(self.slowest, statement)
+
+    def average_queries(self):
+        return self.queries / self.requests
+
+    def average_sql_time(self):
+        return self.sql_time / self.requests
+
+    def average_python_time(self):
+        return (self.total_time - self.sql_time) / self.requests
+
+    def slowest_statements(self):
+        return sorted(self.slowest, reverse=True)
+
+
+# De meting van één verzoek (bewaard in "g" zolang het verzoek loopt).
+class RequestMeasurement(object):
+    def __init__(self, endpoint, path):
+        self.endpoint = endpoint
+        self.path = path
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.total_time = 0.0
+        self.statements = []
+
+    def add_statement(self, statement, duration, slowest):
+        self.queries += 1
+        self.sql_time += duration
+        if len(self.statements) < slowest:
+            heapq.heappush(self.statements, (duration, statement))
+        elif duration > self.statements[0][0]:
+            heapq.heapreplace(self.statements, (duration, statement))
+
+    def python_time(self):
+        return self.total_time - self.sql_time
+
+
+# De metingen binnen dit proces: de totalen per endpoint en de laatste INSTRUMENTATION_RECENT verzoeken.
+class Metrics(object):
+    def __init__(self, recent, slowest):
+        self.slowest = slowest
+        self.endpoints = {}
+        self.recent = deque(maxlen=recent)
+        self.lock = Lock()
+
+    def add(self, measurement):
+        with self.lock:
+            metrics = self.endpoints.get(measurement.endpoint)
+            if metrics is None:
+                metrics = self.endpoints[measurement.endpoint] = EndpointMetrics(measurement.endpoint)
+            metrics.add(measurement, self.slowest)
+            self.recent.append(measurement)
+
+    # De endpoints gesorteerd op de totale tijd (het duurste endpoint eerst).
+    def sorted_endpoints(self):
+        with self.lock:
+            return sorted(self.endpoints.values(), key=lambda metrics: metrics.total_time, reverse=True)
+
+    def recent_requests(self):
+        with self.lock:
+            return list(reversed(self.recent))
+
+    def clear(self):
+        with self.lock:
+            self.endpoints.clear()
+            self.recent.clear()
+
+
+# De statements worden op alle engines gemeten, maar alleen bijgehouden binnen een verzoek dat gemeten wordt. De
+# begintijd van een statement staat (als stapel) in de "info" van de verbinding.
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start_time')
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    measurement = g.get('measurement') if has_request_context() else None
+    if measurement is not None:
+        measurement.add_statement(statement[:500], duration, g.metrics.slowest)
+
+
+def start_measurement(app, **extra):
+    g.metrics = app.extensions['instrumentation']
+    g.measurement = RequestMeasurement(request.endpoint or request.path, request.path)
+
+
+def finish_measurement(app, **extra):
+    measurement = g.pop('measurement', None)
+    if measurement is None:
+        return
+    measurement.total_time = time.perf_counter() - measurement.start
+    g.metrics.add(measurement)
+    app.logger.info('%s %s: %d queries, %.1f ms SQL, %.1f ms Python', measurement.endpoint, measurement.path,
+                    measurement.queries, measurement.sql_time * 1000, measurement.python_time() * 1000)
+
+
+def init_instrumentation(app):
+    if not app.config['INSTRUMENTATION']:
+        return
+    app.extensions['instrumentation'] = Metrics(app.config['INSTRUMENTATION_RECENT'],
+                                                app.config['INSTRUMENTATION_SLOWEST'])
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+    request_started.connect(start_measurement, app)
+    request_finished.connect(finish_measurement, app)
+
+
+# De metingen van de applicatie, of None als INSTRUMENTATION uit staat.
+def app_metrics(app):
+    return app.extensions.get('instrumentation')
@@ -65,10 +65,16 @@ class CreateNewDemographicForm(FlaskForm):
 # de vragenlijst (zoals de hoeveelheid vragen binnen een kernvariabele en hoeveel demografische informatie opgeslagen)
 # door de gebruiker zelf bepaald worden en dus de hoeveelheid onbepaald is voor de programmeur voorafgaand.
 def DynamicTestForm(questions, *args, **kwargs):
+    return DynamicFormClass(questions)(*args, **kwargs)
+
+
+# De klasse van de dynamische Form zelf. Deze kan eenmalig aangemaakt en daarna bij ieder verzoek opnieuw gebruikt
+# worden (zie "QuestionnaireDefinition" binnen "app/main/functions.py").
+def DynamicFormClass(questions):
     class TestForm(FlaskForm):
         submit = SubmitField('Go to next page')
 
     for name, value in questions.items():
         setattr(TestForm, name, value)
 
-    return TestForm(*args, **kwargs)
+    return TestForm
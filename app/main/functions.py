@@ -1,4 +1,144 @@
+import time
+from types import SimpleNamespace
+from flask import current_app
+from wtforms import RadioField
+from app import db
+from app.analysis.responses import add_case_response, questionnaire_items
+from app.analysis.running import record_case
+from app.main.forms import DynamicFormClass
+from app.models import Study, Questionnaire, QuestionGroup, Question, Demographic, Case, Answer, DemographicAnswer
+
+# Een cache binnen het proces met het Case-id per (sessie, vragenlijst) en het moment waarop dat gegeven verloopt.
+# Hiermee hoeft bij iedere pagina van de vragenlijst niet opnieuw in de database gezocht te worden naar de case van de
+# participant.
+case_ids = {}
+# Het aantal gegevens in de cache waarboven de verlopen gegevens verwijderd worden.
+CASE_CACHE_SIZE = 10000
+# Een cache binnen het proces met de opbouw van de vragenlijst per onderzoekscode (zie "questionnaire_definition").
+questionnaire_definitions = {}
+
+
 # Het omdraaien van de score in het geval dat "reversed_score" geldt voor de vraag.
 def reverse_value(value, scale):
     new_value = scale + 1 - int(value)
     return str(new_value)
+
+
+# Het Case-id van de sessie binnen de vragenlijst, of None als de sessie (nog) geen case heeft binnen de vragenlijst.
+# Eerst wordt de cache bekeken, anders wordt de case met een (geïndexeerde) query op session_id opgezocht.
+def session_case_id(session_id, questionnaire_id):
+    cached = case_ids.get((session_id, questionnaire_id))
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+
+    case_id = db.session.query(Case.id).filter_by(session_id=session_id, questionnaire_id=questionnaire_id).scalar()
+    if case_id is not None:
+        remember_case_id(session_id, questionnaire_id, case_id)
+    return case_id
+
+
+# Het Case-id van de sessie opslaan in de cache (bijvoorbeeld direct na het aanmaken van de case).
+def remember_case_id(session_id, questionnaire_id, case_id):
+    now = time.monotonic()
+    if len(case_ids) >= CASE_CACHE_SIZE:
+        for key in [key for (key, (cached_id, expires)) in case_ids.items() if expires <= now]:
+            del case_ids[key]
+        # Als de cache dan nog steeds vol is wordt deze geleegd.
+        if len(case_ids) >= CASE_CACHE_SIZE:
+            case_ids.clear()
+    case_ids[(session_id, questionnaire_id)] = (case_id, now + current_app.config['CASE_CACHE_TTL'])
+
+
+# Het opslaan van de antwoorden en demografische antwoorden van een case en het voltooien van de case, in één transactie
+# met bulk inserts (in plaats van een commit per antwoord). De antwoorden komen uit de sessie: "answers" met het id van
+# de vraag als key en de score als waarde, "demographic_answers" met het id van de demografiek als key en het antwoord
+# als waarde. Eerst wordt de case als voltooid gemarkeerd voor zover deze dat nog niet was: is de case al voltooid
+# (bijvoorbeeld als de laatste pagina twee keer verstuurd wordt), dan worden de antwoorden niet nog een keer opgeslagen.
+# "items" zijn de vraag-ID's in de volgorde van de vragenlijst (zie "QuestionnaireDefinition.question_ids"); zonder
+# worden deze uit de database gehaald. Geeft aan of de antwoorden opgeslagen zijn.
+def submit_case(case_id, answers, demographic_answers, items=None):
+    completed = Case.query.filter_by(id=case_id, completed=False).update({'completed': True},
+                                                                        synchronize_session=False)
+    if not completed:
+        db.session.rollback()
+        return False
+
+    questionnaire_id = db.session.query(Case.questionnaire_id).filter_by(id=case_id).scalar()
+    db.session.bulk_insert_mappings(Answer, [
+        {'score': score, 'question_id': question_id, 'case_id': case_id} for (question_id, score) in answers.items()])
+    db.session.bulk_insert_mappings(DemographicAnswer, [
+        {'answer': answer, 'demographic_id': demographic_id, 'case_id': case_id}
+        for (demographic_id, answer) in demographic_answers.items()])
+    # De antwoorden ook in brede vorm (één blob per case) voor de data-analyse, zie "app/analysis/responses.py".
+    if items is None:
+        items = questionnaire_items(questionnaire_id)
+    response_id = add_case_response(case_id, questionnaire_id, items, answers)
+    db.session.commit()
+
+    # De lopende statistieken van de vragenlijst bijwerken met de antwoorden van deze case.
+    record_case(questionnaire_id, response_id, answers)
+    return True
+
+
+# De opbouw van de vragenlijst van een onderzoek: de vragengroepen met de vragen, de schaal, de demografieken en de
+# klassen van de Forms. Er worden alleen eenvoudige gegevens bewaard (geen objecten uit de database), zodat de opbouw
+# tussen verzoeken gedeeld kan worden.
+class QuestionnaireDefinition(object):
+    def __init__(self, study, questionnaire, demographics, questiongroups, questions):
+        self.study = SimpleNamespace(id=study.id, name=study.name, description=study.description, code=study.code)
+        self.questionnaire_id = questionnaire.id
+        self.scale = questionnaire.scale
+
+        # De demografieken en de Form om deze in te vullen.
+        self.demographics = [SimpleNamespace(id=demographic.id, name=demographic.name) for demographic in demographics]
+        self.demographic_form = DynamicFormClass({demographic.name: demographic.return_field()
+                                                  for demographic in demographics})
+
+        # De vragengroepen (in de volgorde van de vragenlijst) met de vragen en een Form met een RadioField per vraag.
+        self.questiongroups = {}
+        self.questiongroup_ids = []
+        for questiongroup in questiongroups:
+            questions_group = [SimpleNamespace(id=question.id, question=question.question,
+                                               reversed_score=question.reversed_score)
+                               for question in questions if question.questiongroup_id == questiongroup.id]
+            form = DynamicFormClass({question.question: RadioField(question.question,
+                                                                   choices=list(range(1, questionnaire.scale + 1)))
+                                     for question in questions_group})
+            self.questiongroups[questiongroup.id] = SimpleNamespace(id=questiongroup.id, title=questiongroup.title,
+                                                                    description=questiongroup.description,
+                                                                    questions=questions_group, form=form)
+            self.questiongroup_ids.append(questiongroup.id)
+        # De ID's van alle vragen in de volgorde van de vragenlijst (voor de brede opslag van de antwoorden).
+        self.question_ids = [question.id for questiongroup_id in self.questiongroup_ids
+                             for question in self.questiongroups[questiongroup_id].questions]
+        self.question_count = len(self.question_ids)
+
+
+# De opbouw van de vragenlijst van het onderzoek met de gegeven code, of None als het onderzoek niet bestaat. Tijdens
+# stage_2 kan de vragenlijst niet meer veranderen, waardoor de opbouw dan QUESTIONNAIRE_CACHE_TTL seconden bewaard
+# wordt. Bij het wisselen van stage wordt de opbouw verwijderd (zie "forget_questionnaire_definition").
+def questionnaire_definition(study_code):
+    cached = questionnaire_definitions.get(study_code)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+
+    study = Study.query.filter_by(code=study_code).first()
+    if study is None:
+        return None
+    questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+    demographics = Demographic.query.filter_by(questionnaire_id=questionnaire.id).order_by(Demographic.id).all()
+    questiongroups = QuestionGroup.query.filter_by(questionnaire_id=questionnaire.id).order_by(QuestionGroup.id).all()
+    questions = Question.query.join(QuestionGroup, Question.questiongroup_id == QuestionGroup.id) \
+        .filter(QuestionGroup.questionnaire_id == questionnaire.id).order_by(Question.id).all()
+    definition = QuestionnaireDefinition(study, questionnaire, demographics, questiongroups, questions)
+
+    if study.stage_2:
+        questionnaire_definitions[study_code] = (definition,
+                                                 time.monotonic() + current_app.config['QUESTIONNAIRE_CACHE_TTL'])
+    return definition
+
+
+# Het verwijderen van de opbouw van de vragenlijst uit de cache, bijvoorbeeld bij het starten of beëindigen van het
+# onderzoek.
+def forget_questionnaire_definition(study_code):
+    questionnaire_definitions.pop(study_code, None)
@@ -1,24 +1,28 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from flask import render_template, flash, redirect, url_for, request, session
+from flask import render_template, flash, redirect, url_for, request, session, abort, current_app
 from flask_login import current_user, login_required
-from wtforms import RadioField
 
 from app import db
 from app.main import bp
 from app.main.forms import EditProfileForm, EmptyForm, CreateNewQuestionUser, GoToStartQuestionlist, \
-    CreateNewDemographicForm, DynamicTestForm
-from app.main.functions import reverse_value
-from app.models import User, Study, CoreVariable, Questionnaire, StandardQuestion, Case, \
-    QuestionGroup, Question, Answer, DemographicAnswer, StandardDemographic, Demographic
+    CreateNewDemographicForm
+from app.main.functions import reverse_value, session_case_id, remember_case_id, submit_case, \
+    questionnaire_definition
+from app.models import User, Study, CoreVariable, StandardQuestion, Case, StandardDemographic
 
 
+# Het bijwerken van "last_seen" gebeurt hoogstens eens per LAST_SEEN_INTERVAL seconden per gebruiker, zodat niet iedere
+# pagina (bijvoorbeeld binnen de data-analyse) een schrijfactie op de database geeft.
 @bp.before_app_request
 def before_request():
     if current_user.is_authenticated:
-        current_user.last_seen = datetime.utcnow()
-        db.session.commit()
+        now = datetime.utcnow()
+        last_seen = current_user.last_seen
+        if last_seen is None or now - last_seen >= timedelta(seconds=current_app.config['LAST_SEEN_INTERVAL']):
+            current_user.last_seen = now
+            db.session.commit()
 
 
 @bp.route('/', methods=['GET', 'POST'])
@@ -231,81 +235,74 @@ def invalid_session():
 
 @bp.route('/d/e/<study_code>', methods=['GET', 'POST'])
 def intro_questionlist(study_code):
-    # Als de gebruiker nog niet in een sessie zit een nieuwe sessie aanmaken.
-    if "user" not in session:
+    # Als de gebruiker nog niet in een sessie (van dit onderzoek) zit een nieuwe sessie aanmaken.
+    if "user" not in session or session.get("study") != study_code:
         session["user"] = str(uuid.uuid4())
         session["study"] = study_code
 
+    # De opbouw van de vragenlijst (zie "questionnaire_definition").
+    definition = questionnaire_definition(study_code)
+    if definition is None:
+        abort(404)
+
     # Als de gebruiker al in een sessie zit verwijzen naar de vragenlijst.
-    if session["user"] in [case.session_id for case in Case.query.all()]:
+    if session_case_id(session["user"], definition.questionnaire_id) is not None:
         flash('You are currently already in a session. Complete the questionnaire.')  # return eerste blok vragenpagina
         return redirect(url_for('main.questionlist', study_code=study_code, questionlist_number=0))
 
     # De Form om aangeven te starten met het onderzoek.
     form = GoToStartQuestionlist()
-    study = Study.query.filter_by(code=study_code).first()
-    questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
-    demographics = [demographic for demographic in Demographic.query.filter_by(questionnaire_id=questionnaire.id)]
 
     # Als de gebruiker aangeeft door te willen gaan naar de start van de vragenlijst.
     if form.validate_on_submit():
         return redirect(url_for('main.start_questionlist', study_code=study_code))
 
-    return render_template('intro_questionlist.html', title="Intro: {}".format(study.name), study=study,
-                           study_code=study_code, form=form, demographics=demographics)
+    return render_template('intro_questionlist.html', title="Intro: {}".format(definition.study.name),
+                           study=definition.study, study_code=study_code, form=form,
+                           demographics=definition.demographics)
 
 
 @bp.route('/d/e/start/<study_code>', methods=['GET', 'POST'])
 def start_questionlist(study_code):
-    study = Study.query.filter_by(code=study_code).first()
-    questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+    definition = questionnaire_definition(study_code)
+    if definition is None:
+        abort(404)
 
-    # Een dictionary met de demografieken en een "return field" zodat de gebruiker alle demografieken kan invullen en
+    # De Form met een "return field" voor iedere demografiek, zodat de gebruiker alle demografieken kan invullen en
     # deze ook daadwerkelijk opgeslagen worden.
-    demographics_dict = {}
-    demographics = [demographic for demographic in Demographic.query.filter_by(questionnaire_id=questionnaire.id)]
-    for demographic in demographics:
-        demographics_dict[demographic.name] = demographic.return_field()
-    form = DynamicTestForm(demographics_dict)
+    form = definition.demographic_form()
 
     # Als de gebruiker aangeeft de demografieken ingevuld te hebben.
     if form.validate_on_submit():
-        if session["user"] in [case.session_id for case in Case.query.all()] and session["study"] == study_code:
+        if session_case_id(session["user"], definition.questionnaire_id) is not None:
             flash('You are currently already in a session. Complete the questionnaire.')
             return redirect(url_for('main.questionlist', study_code=study_code, questionlist_number=0))
 
-        study = Study.query.filter_by(code=study_code).first()
-        questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
         # Het toevoegen van een case aan de database.
-        case = Case(session_id=session["user"], questionnaire_id=questionnaire.id)
+        case = Case(session_id=session["user"], questionnaire_id=definition.questionnaire_id)
         db.session.add(case)
         db.session.commit()
+        remember_case_id(session["user"], definition.questionnaire_id, case.id)
 
-        # De antwoorden op de demografieken worden nog niet opgeslagen in de database, maar wel in de sessie.
-        session["demographic_answers"] = []
-        for (demographic, answer) in zip([demographic for demographic in demographics], form.data.values()):
-            demographic_answer = DemographicAnswer(answer=answer, demographic_id=demographic.id,
-                                                   case_id=Case.query.filter_by(session_id=session["user"]).first().id)
-            session["demographic_answers"].append(demographic_answer)
-
-        # Een dictionary met een numerieke key (0 tot en met zoveel) en de vragengroep (questiongroup_dict).
-        questiongroup_dict = {}
-        questiongroups = [questiongroup for questiongroup in questionnaire.linked_questiongroups]
-        keys = range(len(questiongroups))
-        for i in keys:
-            questiongroup_dict[i] = questiongroups[i]
+        # De antwoorden op de demografieken worden nog niet opgeslagen in de database, maar wel in de sessie: een
+        # dictionary met het id van de demografiek als key en het antwoord als waarde. Pas bij het versturen van de
+        # vragenlijst worden hier rijen in de database van gemaakt (zie "submit_case").
+        session["demographic_answers"] = {}
+        for (demographic, answer) in zip(definition.demographics, form.data.values()):
+            session["demographic_answers"][demographic.id] = answer
 
         # Evenals de demografische antwoorden worden de antwoorden op de vragen nog niet opgeslagen in de database, maar
-        # wel in de sessie. De eerste twee sessiedata hieronder zijn om de vragenlijst goed te renderen (de eerste om
-        # de vragenlijst op te delen tussen de vragengroepen, de tweede om te gaan naar het eindscherm zodra de laatste
-        # is ingevuld).
-        session["questionlist_questiongroups"] = questiongroup_dict
-        session["questionlist_maxamount"] = QuestionGroup.query.filter_by(questionnaire_id=questionnaire.id).count()
-        session["answers"] = []
+        # wel in de sessie (als dictionary met het id van de vraag als key en de score als waarde). De eerste twee
+        # sessiedata hieronder zijn om de vragenlijst goed te renderen (de eerste om de vragenlijst op te delen tussen
+        # de vragengroepen, de tweede om te gaan naar het eindscherm zodra de laatste is ingevuld).
+        session["questionlist_questiongroups"] = list(definition.questiongroup_ids)
+        session["questionlist_maxamount"] = len(definition.questiongroup_ids)
+        session["answers"] = {}
 
         return redirect(url_for('main.questionlist', study_code=study_code, questionlist_number=0))
 
-    return render_template('start_questionlist.html', title="Start: {}".format(study.name), study=study, form=form)
+    return render_template('start_questionlist.html', title="Start: {}".format(definition.study.name),
+                           study=definition.study, form=form)
 
 
 @bp.route('/c/e/<study_code>/<questionlist_number>', methods=['GET', 'POST'])
@@ -314,68 +311,49 @@ def questionlist(study_code, questionlist_number):
     if int(questionlist_number) >= session['questionlist_maxamount']:
         return redirect(url_for('main.ending_questionlist', study_code=study_code))
 
-    study = Study.query.filter_by(code=study_code).first()
-    questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
-    questionlist = session["questionlist_questiongroups"][int(questionlist_number)]
-    questions = [question for question in Question.query.filter_by(questiongroup_id=questionlist.id)]
+    definition = questionnaire_definition(study_code)
+    if definition is None:
+        abort(404)
+    questionlist = definition.questiongroups[session["questionlist_questiongroups"][int(questionlist_number)]]
+    questions = questionlist.questions
 
-    # Een dictionary met de vraag als key en een bijbehorende Field om in te vullen als waarde (questions_dict).
-    questions_dict = {}
-    for question in questions:
-        questions_dict[question.question] = RadioField(question.question,
-                                                       choices=[number for number in range(1, questionnaire.scale + 1)])
-    form = DynamicTestForm(questions_dict)
+    # De Form met een RadioField voor iedere vraag binnen de vragengroep.
+    form = questionlist.form()
 
     # De volgende vragengroepnummer voor de verwijzing zodra de gebruiker dit gedeelte van de vragenlijst heeft ingevuld
     next_questionlist_number = int(questionlist_number) + 1
 
     # Als de gebruiker aangeeft dit gedeelte van de vragenlijst ingevuld te hebben.
     if form.validate_on_submit():
-        for (question, value) in zip([question for question in questions], form.data.values()):
+        answers = session["answers"]
+        for (question, value) in zip(questions, form.data.values()):
             # Deze "isinstance" regel wordt opgeroepen om enkele waarden welke toegevoegd werden en niet binnen de
             # antwoorden horen weg te werken. Dit kan gezien worden als een makkelijke work-around.
             if isinstance(value, str) and len(value) < 4:
-                # Als een antwoord op de vraag al gegeven is binnen de sessie.
-                if question.id in [answer.question_id for answer in session["answers"]]:
-                    for answer in session["answers"]:
-                        # Voor de vraag die inderdaad al beantwoord is.
-                        if answer.question_id == question.id:
-                            # Als de vraag met "reversed_score" werkt de gegeven score omdraaien.
-                            if question.reversed_score:
-                                answer.score = reverse_value(value, questionnaire.scale)
-                            else:
-                                answer.score = value
-                # Als nog geen antwoord op de vraag gegeven is binnen de sessie.
+                # Het antwoord toevoegen aan de sessie, of het al gegeven antwoord op de vraag vervangen. Als de vraag
+                # met "reversed_score" werkt de gegeven score omdraaien.
+                if question.reversed_score:
+                    answers[question.id] = reverse_value(value, definition.scale)
                 else:
-                    # Als de vraag met "reversed_score" werkt de gegeven score omdraaien. Het antwoord sowieso toevoegen
-                    # aan de sessie.
-                    if question.reversed_score:
-                        answer = Answer(score=reverse_value(value, questionnaire.scale), question_id=question.id,
-                                        case_id=Case.query.filter_by(session_id=session["user"]).first().id)
-                        session["answers"].append(answer)
-                    else:
-                        answer = Answer(score=value, question_id=question.id,
-                                        case_id=Case.query.filter_by(session_id=session["user"]).first().id)
-                        session["answers"].append(answer)
+                    answers[question.id] = value
+        session["answers"] = answers
         # Naar het volgende onderdeel van de vragenlijst gaan.
         return redirect(
             url_for('main.questionlist', study_code=study_code, questionlist_number=next_questionlist_number))
 
     return render_template('questionlist.html',
-                           title="Questionlist {}: {}".format(str(questionlist_number), study.name),
-                           study=study, questionlist_number=questionlist_number, questions=questions,
+                           title="Questionlist {}: {}".format(str(questionlist_number), definition.study.name),
+                           study=definition.study, questionlist_number=questionlist_number, questions=questions,
                            questionlist=questionlist, next_questionlist_number=next_questionlist_number, form=form)
 
 
 @bp.route('/g/e/<study_code>', methods=['GET', 'POST'])
 def ending_questionlist(study_code):
-    study = Study.query.filter_by(code=study_code).first()
-    questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
-    total_question_number = 0
-    for questiongroup in QuestionGroup.query.filter_by(questionnaire_id=questionnaire.id):
-        total_question_number += Question.query.filter_by(questiongroup_id=questiongroup.id).count()
+    definition = questionnaire_definition(study_code)
+    if definition is None:
+        abort(404)
     # Voor het geval de gebruiker probeert naar het einde te gaan zonder dat alle vragen zijn beantwoord.
-    if len(session["answers"]) < total_question_number:
+    if len(session["answers"]) < definition.question_count:
         flash('You have not answered all of the questions yet. Finish the questions.')
         return redirect(url_for('main.questionlist', study_code=study_code, questionlist_number=0))
 
@@ -384,17 +362,10 @@ def ending_questionlist(study_code):
 
     # Als de gebruiker aangeeft klaar te zijn met de vragenlijst.
     if form.validate_on_submit():
-        # Het opslaan van de antwoorden op de vragen in de database.
-        for answer in session["answers"]:
-            db.session.add(answer)
-            db.session.commit()
-        # Het opslaan van de demografische antwoorden in de database.
-        for answer in session["demographic_answers"]:
-            db.session.add(answer)
-            db.session.commit()
-        # Aangeven dat de vragenlijst voltooid is door de gebruiker/specifieke case.
-        Case.query.filter_by(session_id=session["user"]).first().completed = True
-        db.session.commit()
+        # Het opslaan van de antwoorden, de demografische antwoorden en het voltooien van de case in één transactie (zie
+        # "submit_case"). Bij een tweede keer versturen wordt niets dubbel opgeslagen.
+        submit_case(session_case_id(session["user"], definition.questionnaire_id), session["answers"],
+                    session["demographic_answers"], definition.question_ids)
         session.clear()
         return "Thank you for participating."
     return render_template('ending_questionlist.html', title="Ending Questionnaire", form=form)
@@ -134,7 +134,7 @@ class Questionnaire(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64))
     code = db.Column(db.String(64))
-    study_id = db.Column(db.Integer, db.ForeignKey('study.id'))
+    study_id = db.Column(db.Integer, db.ForeignKey('study.id'), index=True)
     scale = db.Column(db.Integer)
 
     linked_questiongroups = db.relationship('QuestionGroup', backref='questionnaire_questiongroup',
@@ -155,7 +155,7 @@ class Demographic(db.Model):
     choices = db.Column(db.String(200))
     optional = db.Column(db.Boolean, default=True)
     questiontype_name = db.Column(db.String(64), db.ForeignKey('question_type.name'))
-    questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'))
+    questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'), index=True)
 
     def __repr__(self):
         return '<Demographic {}>'.format(self.name)
@@ -185,8 +185,8 @@ class Demographic(db.Model):
 class DemographicAnswer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     answer = db.Column(db.String(200))
-    demographic_id = db.Column(db.Integer, db.ForeignKey('demographic.id'))
-    case_id = db.Column(db.Integer, db.ForeignKey('case.id'))
+    demographic_id = db.Column(db.Integer, db.ForeignKey('demographic.id'), index=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('case.id'), index=True)
 
     def __repr__(self):
         demographic = Demographic.query.filter_by(id=self.demographic_id).first()
@@ -228,7 +228,7 @@ class QuestionGroup(db.Model):
     title = db.Column(db.String(100))
     group_type = db.Column(db.String(50))
     description = db.Column(db.Text)
-    questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'))
+    questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'), index=True)
     corevariable_id = db.Column(db.Integer, db.ForeignKey('core_variable.id'))
 
     def __repr__(self):
@@ -239,8 +239,8 @@ class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     question = db.Column(db.String(100))
     reversed_score = db.Column(db.Boolean, default=False)
-    question_code = db.Column(db.String(10))
-    questiongroup_id = db.Column(db.Integer, db.ForeignKey('question_group.id'))
+    question_code = db.Column(db.String(10), index=True)
+    questiongroup_id = db.Column(db.Integer, db.ForeignKey('question_group.id'), index=True)
 
     answer_question = db.relationship('Answer', backref='answered_question',
                                       lazy='dynamic')
@@ -249,11 +249,15 @@ class Question(db.Model):
         return '<Question {}>'.format(self.question)
 
 
+# De antwoorden worden zowel per vraag (de statistieken per vraag en de dataset) als per case (de samenvatting en de
+# export) opgevraagd: de samengestelde index (question_id, case_id, score) dekt het eerste zonder de tabel zelf te
+# lezen, de index op case_id het tweede.
 class Answer(db.Model):
+    __table_args__ = (db.Index('ix_answer_question_id_case_id_score', 'question_id', 'case_id', 'score'),)
     id = db.Column(db.Integer, primary_key=True)
     score = db.Column(db.SmallInteger)
     question_id = db.Column(db.Integer, db.ForeignKey('question.id'))
-    case_id = db.Column(db.Integer, db.ForeignKey('case.id'))
+    case_id = db.Column(db.Integer, db.ForeignKey('case.id'), index=True)
 
 
 class CoreVariable(db.Model):
@@ -283,7 +287,7 @@ class CoreVariable(db.Model):
 
 class Relation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    model_id = db.Column(db.Integer, db.ForeignKey('utau_tmodel.id'))
+    model_id = db.Column(db.Integer, db.ForeignKey('utau_tmodel.id'), index=True)
     influencer_id = db.Column(db.Integer, db.ForeignKey('core_variable.id'))
     influenced_id = db.Column(db.Integer, db.ForeignKey('core_variable.id'))
     influencer = db.relationship('CoreVariable', foreign_keys=[influencer_id])
@@ -298,7 +302,7 @@ class Relation(db.Model):
 class Case(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(100), unique=True)
-    questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'))
+    questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'), index=True)
     start = db.Column(db.DateTime, index=True, default=datetime.utcnow())
     completed = db.Column(db.Boolean, default=False)
 
@@ -307,6 +311,88 @@ class Case(db.Model):
             demographic = Demographic.query.filter_by(id=demographic_answer.demographic_id).first()
 
 
+# De opgeslagen resultaten van de data-analyse van een afgerond onderzoek (stage_3). De "fingerprint" is gebaseerd op
+# het onderzoeksmodel, de vragen en de antwoorden, zodat de resultaten opnieuw berekend worden zodra één daarvan
+# verandert.
+class AnalysisCache(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    study_id = db.Column(db.Integer, db.ForeignKey('study.id'), index=True, unique=True)
+    fingerprint = db.Column(db.String(32))
+    results = db.Column(db.Text)
+    created = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return '<Analysis cache {}>'.format(self.study_id)
+
+
+# Een opdracht om de data-analyse van een onderzoek op de achtergrond uit te voeren (zie "app/analysis/jobs.py"). De
+# status is "queued", "running", "finished" of "failed"; de voortgang loopt van 0 tot 100. De resultaten zelf worden in
+# AnalysisCache opgeslagen.
+class AnalysisJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    study_id = db.Column(db.Integer, db.ForeignKey('study.id'), index=True)
+    status = db.Column(db.String(20), index=True, default='queued')
+    progress = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    created = db.Column(db.DateTime, default=datetime.utcnow)
+    started = db.Column(db.DateTime)
+    finished = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return '<Analysis job {} ({})>'.format(self.id, self.status)
+
+
+# De lopende sommen van de antwoorden van een vragenlijst, bijgewerkt bij het versturen van iedere vragenlijst (zie
+# "app/analysis/running.py"). "items" bevat de vraag-ID's (JSON, in de volgorde van de vragenlijst), "sums" per item de
+# som van de scores en "products" per paar van items de som van de producten van de scores. "cases" is het aantal
+# verwerkte voltooide cases en "count" het aantal daarvan dat alle vragen beantwoord heeft (alleen deze tellen mee in de
+# sommen). "last_response" is het hoogste ID van de meegetelde blobs (CaseResponse, in de volgorde van het voltooien),
+# zodat geen case twee keer meetelt. "version" wordt bij iedere wijziging verhoogd, zodat gelijktijdige wijzigingen
+# elkaar niet overschrijven.
+class QuestionnaireStatistics(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'), index=True, unique=True)
+    items = db.Column(db.Text)
+    cases = db.Column(db.Integer, default=0)
+    count = db.Column(db.Integer, default=0)
+    sums = db.Column(db.Text)
+    products = db.Column(db.Text)
+    last_response = db.Column(db.Integer, default=0)
+    version = db.Column(db.Integer, default=0)
+    updated = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return '<Questionnaire statistics {} ({} cases)>'.format(self.questionnaire_id, self.count)
+
+
+# De antwoorden van één voltooide case in "brede" vorm: de scores van alle vragen van de vragenlijst samen in één blob
+# (zie "app/analysis/responses.py"), zodat de data-analyse de volledige antwoordmatrix met één query kan lezen in plaats
+# van alle losse antwoorden om te zetten. "layout" is een hash van de vraag-ID's (in de volgorde van de vragenlijst)
+# waarmee de scores opgeslagen zijn.
+class CaseResponse(db.Model):
+    __table_args__ = (db.Index('ix_case_response_questionnaire_id_case_id', 'questionnaire_id', 'case_id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('case.id'), index=True, unique=True)
+    questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'))
+    layout = db.Column(db.String(32))
+    scores = db.Column(db.LargeBinary)
+
+    def __repr__(self):
+        return '<Case response {}>'.format(self.case_id)
+
+
+# De sessies van de gebruikers en participanten wanneer deze in de database opgeslagen worden (SESSION_TYPE =
+# "sqlalchemy", zie "app/sessions.py").
+class SessionData(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.String(255), index=True, unique=True)
+    data = db.Column(db.LargeBinary)
+    expiry = db.Column(db.DateTime, index=True)
+
+    def __repr__(self):
+        return '<Session {}>'.format(self.session_id)
+
+
 @login.user_loader
 def load_user(id):
     return User.query.get(int(id))
@@ -0,0 +1,71 @@
+from flask import current_app
+
+from app import db
+from app.analysis.cache import analysis_bootstrap_samples, cached_results, stored_results
+from app.analysis.dataset import save_snapshot, valid_snapshot
+from app.analysis.jobs import enqueue_analysis, update_progress, finish_job, fail_job
+from app.analysis.live import live_statistics
+from app.analysis.pipeline import AnalysisResult, run_pipeline
+from app.models import Study, UTAUTmodel, Questionnaire
+
+# De berekeningen van de data-analyse. Alleen deze module (en niet "app/new_study/functions.py" of de routes zelf) laadt
+# de rekenmodules (numpy, pandas en plspm via "app/analysis"). De routes en opdrachten die een analyse uitvoeren
+# importeren deze module pas bij het eerste gebruik, waardoor een proces dat alleen de vragenlijst toont (of een
+# CLI-opdracht zonder analyse) deze niet hoeft te laden.
+
+
+# De resultaten van de data-analyse van het onderzoek (een AnalysisResult, zie "app/analysis/pipeline.py"). Bij een
+# afgerond onderzoek worden deze uit de database gehaald zolang het onderzoeksmodel, de vragen en de antwoorden niet
+# veranderd zijn.
+def study_analysis(study, questionnaire, model, corevariables):
+    return AnalysisResult.from_dict(cached_results(study, questionnaire, model,
+                                                   lambda: run_pipeline(questionnaire, model, corevariables).to_dict()))
+
+
+# De resultaten van de data-analyse als deze al opgeslagen zijn, anders (met ANALYSIS_JOBS) een opdracht om deze op de
+# achtergrond te berekenen. Geeft (resultaten, None) of (None, opdracht). Zonder ANALYSIS_JOBS worden de resultaten
+# direct binnen het verzoek berekend.
+def analysis_or_job(study, questionnaire, model, corevariables):
+    if not current_app.config['ANALYSIS_JOBS']:
+        return study_analysis(study, questionnaire, model, corevariables), None
+
+    results = stored_results(study, questionnaire, model)
+    if results is not None:
+        return AnalysisResult.from_dict(results), None
+    return None, enqueue_analysis(study)
+
+
+# De lopende statistieken van de vragenlijst tijdens het onderzoek (stage_2), zie "app/analysis/live.py".
+def underway_statistics(questionnaire, model):
+    return live_statistics(questionnaire, [corevariable for corevariable in model.linked_corevariables])
+
+
+# Het vastleggen van de antwoorden van een afgerond onderzoek als snapshot op schijf, zie "app/analysis/snapshot.py".
+def snapshot_study(questionnaire):
+    return save_snapshot(questionnaire)
+
+
+# De snapshot van de antwoorden als deze nog bij de gegeven vragen past, anders None (zie "export_rows").
+def study_snapshot(questionnaire, questions):
+    return valid_snapshot(questionnaire, [question.id for question in questions])
+
+
+# Het uitvoeren van een opdracht uit de wachtrij (zie "flask analysis worker"): de resultaten worden berekend en in
+# AnalysisCache opgeslagen. Geeft aan of de opdracht gelukt is.
+def run_analysis_job(job):
+    try:
+        study = Study.query.get(job.study_id)
+        questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+        model = UTAUTmodel.query.get(study.model_id)
+        corevariables = [corevariable for corevariable in model.linked_corevariables]
+        cached_results(study, questionnaire, model,
+                       lambda: run_pipeline(questionnaire, model, corevariables,
+                                            progress=lambda percentage: update_progress(job, percentage),
+                                            bootstrap_samples=analysis_bootstrap_samples()).to_dict())
+    except Exception as error:
+        db.session.rollback()
+        fail_job(job, error)
+        return False
+
+    finish_job(job)
+    return True
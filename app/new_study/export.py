@@ -0,0 +1,101 @@
+import csv
+import io
+import os
+import tempfile
+import xlsxwriter
+from app import db
+from app.models import Case, Answer, DemographicAnswer
+
+# Het aantal rijen dat per keer uit de database gehaald wordt.
+CHUNK_SIZE = 1000
+
+
+# De volledige dataset van de vragenlijst (cases x (demografieken + vragen)) rij voor rij, te beginnen met de kop. De
+# cases worden per CHUNK_SIZE opgehaald (keyset op Case.id, zie "case_page"); per stuk worden de antwoorden en de
+# demografische antwoorden binnen dat bereik met "yield_per" doorlopen. Zo staat nooit de hele dataset in het geheugen
+# en is er steeds maar één query tegelijk open. Met een snapshot (zie "app/analysis/snapshot.py", met dezelfde vragen)
+# komen de scores van de voltooide cases daaruit en worden alleen de antwoorden van de overige cases gelezen.
+def export_rows(questionnaire, demographics, questions, snapshot=None):
+    yield ['ID'] + [demographic.name for demographic in demographics] + \
+          [question.question_code for question in questions]
+
+    after = 0
+    while True:
+        case_ids = [case_id for (case_id,) in db.session.query(Case.id)
+                    .filter(Case.questionnaire_id == questionnaire.id, Case.id > after)
+                    .order_by(Case.id).limit(CHUNK_SIZE)]
+        if not case_ids:
+            return
+        first, after = case_ids[0], case_ids[-1]
+
+        # Bij een dubbel antwoord telt het laatste antwoord op een vraag en het eerste demografische antwoord (net als
+        # in "summary_answers" en "summary_demographics").
+        answers = db.session.query(Answer.case_id, Answer.question_id, Answer.score) \
+            .join(Case, Answer.case_id == Case.id) \
+            .filter(Case.questionnaire_id == questionnaire.id, Case.id.between(first, after)) \
+            .order_by(Answer.id)
+        scores = {}
+        if snapshot is not None:
+            answers = answers.filter(Case.completed == False)
+            for (case_id, case_scores) in snapshot.case_scores(case_ids).items():
+                scores.update({(case_id, question.id): score for (question, score) in zip(questions, case_scores)})
+        for (case_id, question_id, score) in answers.yield_per(CHUNK_SIZE):
+            scores[(case_id, question_id)] = score
+
+        demographic_answers = db.session.query(DemographicAnswer.case_id, DemographicAnswer.demographic_id,
+                                               DemographicAnswer.answer) \
+            .join(Case, DemographicAnswer.case_id == Case.id) \
+            .filter(Case.questionnaire_id == questionnaire.id, Case.id.between(first, after)) \
+            .order_by(DemographicAnswer.id)
+        given = {}
+        for (case_id, demographic_id, answer) in demographic_answers.yield_per(CHUNK_SIZE):
+            given.setdefault((case_id, demographic_id), answer)
+
+        for case_id in case_ids:
+            yield [case_id] + [given.get((case_id, demographic.id)) for demographic in demographics] + \
+                  [scores.get((case_id, question.id)) for question in questions]
+
+
+# De rijen als CSV, één regel per keer.
+def csv_stream(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+# De rijen als Excel-bestand. XlsxWriter schrijft in "constant_memory"-modus iedere rij direct weg naar een tijdelijk
+# bestand, waarna het bestand in stukken verstuurd en daarna verwijderd wordt. Geeft (stukken, opruimen): het opruimen
+# kan vaker aangeroepen worden en hoort ook bij het sluiten van de response te gebeuren, omdat de stukken niet gelezen
+# worden als de verbinding al eerder verbroken wordt.
+def xlsx_stream(rows, sheet_name='Results'):
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(handle)
+    try:
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        worksheet = workbook.add_worksheet(sheet_name)
+        for (row_number, row) in enumerate(rows):
+            worksheet.write_row(row_number, 0, row)
+        workbook.close()
+    except Exception:
+        os.remove(path)
+        raise
+
+    def remove():
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def chunks():
+        try:
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(64 * 1024), b''):
+                    yield chunk
+        finally:
+            remove()
+
+    return chunks(), remove
@@ -1,23 +1,20 @@
-from flask import render_template, flash, redirect, url_for, request
+from flask import render_template, flash, redirect, url_for, request, jsonify, Response, stream_with_context
 from flask_login import current_user, login_required
-import numpy as np
-import pandas as pd
-import plspm.config as c
 import json
-from plspm.plspm import Plspm
-from plspm.scheme import Scheme
-from plspm.mode import Mode
 from app import db
 from app.models import User, Study, UTAUTmodel, CoreVariable, Relation, Questionnaire, Question, StandardQuestion, \
-    QuestionGroup, Demographic, StandardDemographic, Case, DemographicAnswer, Answer
+    QuestionGroup, Demographic, StandardDemographic
 from app.new_study import bp
 from app.new_study.forms import CreateNewStudyForm, CreateNewCoreVariableForm, CreateNewRelationForm, \
     CreateNewQuestion, ChooseNewModel, AddCoreVariable, EditStudyForm, AddDemographic, AddUserForm, ScaleForm, \
     CreateNewDemographicForm
-from app.new_study.functions import variance, cronbachs_alpha, composite_reliability, average_variance_extracted, \
-    covariance, pearson_correlation, correlation_matrix, heterotrait_monotrait, htmt_matrix, outer_vif_values_dict
-from statsmodels.stats.outliers_influence import variance_inflation_factor
-from statsmodels.tools.tools import add_constant
+from app.new_study.functions import requested_case_page, summary_demographics, summary_answers, summary_statistics, \
+    neighbouring_corevariables
+from app.analysis.jobs import latest_job
+from app.main.functions import questionnaire_definition, forget_questionnaire_definition
+from app.new_study.export import export_rows, csv_stream, xlsx_stream
+from app.analysis.questions import questionnaire_questions
+from app.analysis.running import reset_statistics
 
 
 #############################################################################################################
@@ -719,6 +716,14 @@ def start_study(study_code):
     study.stage_2 = True
     db.session.commit()
 
+    # Vanaf nu staat de vragenlijst vast, waardoor de opbouw ervan één keer gemaakt en bewaard kan worden.
+    forget_questionnaire_definition(study_code)
+    questionnaire_definition(study_code)
+
+    # De lopende statistieken beginnen leeg en worden bij iedere verstuurde vragenlijst bijgewerkt.
+    questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+    reset_statistics(questionnaire.id, [question.id for question in questionnaire_questions(questionnaire)])
+
     return redirect(url_for('new_study.study_underway', name_study=study.name, study_code=study_code))
 
 
@@ -739,8 +744,13 @@ def study_underway(name_study, study_code):
     # De link naar de vragenlijst
     link = '127.0.0.1:5000/d/e/{}'.format(study.code)
 
+    # De lopende statistieken (gemiddelden, standaarddeviaties, correlaties, Cronbach's Alpha en HTMT) van de tot nu toe
+    # voltooide vragenlijsten, zonder alle antwoorden opnieuw te lezen.
+    from app.new_study.analysis import underway_statistics
+    statistics = underway_statistics(questionnaire, UTAUTmodel.query.filter_by(id=study.model_id).first())
+
     return render_template('new_study/study_underway.html', title="Underway: {}".format(name_study), study=study,
-                           link=link, questionnaire=questionnaire)
+                           link=link, questionnaire=questionnaire, statistics=statistics)
 
 
 @bp.route('/end_questionnaire/<study_code>', methods=['GET', 'POST'])
@@ -761,6 +771,12 @@ def end_questionnaire(study_code):
     study.stage_2 = False
     study.stage_3 = True
     db.session.commit()
+    forget_questionnaire_definition(study_code)
+
+    # De antwoorden staan nu vast: deze worden als snapshot op schijf vastgelegd (na het maken van de ontbrekende brede
+    # blobs), zodat de data-analyse en de export de antwoordmatrix direct kunnen lezen.
+    from app.new_study.analysis import snapshot_study
+    snapshot_study(Questionnaire.query.filter_by(study_id=study.id).first())
 
     return redirect(url_for('new_study.summary_results', study_code=study_code))
 
@@ -785,93 +801,116 @@ def summary_results(study_code):
 
     questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
     demographics = [demographic for demographic in Demographic.query.filter_by(questionnaire_id=questionnaire.id)]
-    total_cases = [case for case in Case.query.filter_by(questionnaire_id=questionnaire.id)]
-
-    # Samenvatting van de demografische resultaten
-
-    # Een lijst met alle case-id's en de opzet ervan.
-    cases = []
-    for case in total_cases:
-        for i in range(len(demographics)):
-            cases.append(case.id)
-
-    # Namen van de demografieken en de opzet ervan
-    demos = []
-    for case in total_cases:
-        for demographic in demographics:
-            demos.append(demographic.name)
-
-    # Dictionary met de Case-id's als keys en de gegeven demografische antwoorden als waarden en de opzet ervan
-    dct_demographics = {}
-    for case in cases:
-        dct_demographics[case] = []
-    for (case_id, demo_name) in zip(cases, demos):
-        demo = Demographic.query.filter_by(name=demo_name).first()
-        answer = DemographicAnswer.query.filter_by(case_id=case_id, demographic_id=demo.id).first()
-        if answer is not None:
-            dct_demographics[case_id].append(answer.answer)
-        else:
-            dct_demographics[case_id].append(None)
+    questions = questionnaire_questions(questionnaire)
+
+    # De cases worden per pagina getoond (zie "case_page").
+    total_cases, has_previous, has_next, per_page = requested_case_page(questionnaire)
+    cases = [case.id for case in total_cases]
+
+    # Samenvatting van de demografische resultaten: een dictionary met de Case-id's als keys en de gegeven demografische
+    # antwoorden als waarden.
+    dct_demographics = summary_demographics(questionnaire, total_cases, demographics)
 
     # Samenvatting van de vragenlijstresultaten voor iedere case
+    dct_answers = summary_answers(questionnaire, total_cases, questions)
 
-    # Alle vragengroepen binnen de vragenlijst
-    questiongroups = [questiongroup for questiongroup in questionnaire.linked_questiongroups]
+    # Samenvatting van de gemiddeldes en standaarddeviaties voor iedere vraag (over alle cases)
+    dct_questions = summary_statistics(questionnaire, questions)
 
-    # Een lijst met de vragen en de opzet ervan
-    questions = []
-    for questiongroup in questiongroups:
-        list_of_questions = [question for question in Question.query.filter_by(questiongroup_id=questiongroup.id)]
-        for question in list_of_questions:
-            questions.append(question)
-
-    # Een lijst met de Case-id's
-    cases = []
-    for case in total_cases:
-        for i in range(len(questions)):
-            cases.append(case.id)
-
-    # Een lijst met de vragen in stringvorm en de opzet ervan
-    quests = []
-    for case in total_cases:
-        for question in questions:
-            quests.append(question.question)
-
-    # Een dictionary met alle cases en de bijbehorende antwoorden op de vragen en de opzet ervan
-    dct_answers = {}
-    for case in cases:
-        dct_answers[case] = []
-    for (case_id, quest_name) in zip(cases, quests):
-        for questiongroup in questiongroups:
-            quest = Question.query.filter_by(question=quest_name, questiongroup_id=questiongroup.id).first()
-            if quest is not None:
-                answer = Answer.query.filter_by(question_id=quest.id, case_id=case_id).first()
-                if answer is not None:
-                    dct_answers[case_id].append(answer.score)
-                else:
-                    dct_answers[case_id].append(None)
-
-    # Samenvatting van de gemiddeldes en standaarddeviaties voor iedere vraag
-
-    # Het creëren van een dictionary met de vragen en een lijst waar de gemiddelden en standaarddeviaties in komen
-    dct_questions = {}
-    for questiongroup in questiongroups:
-        for question in [question for question in Question.query.filter_by(questiongroup_id=questiongroup.id)]:
-            dct_questions[question] = []
-
-    #Voor iedere vraag in de vragenlijst
-    for question in dct_questions:
-        # Een lijst met de scores van de specifieke vraag
-        answer_scores = []
-        for answer in [answer for answer in Answer.query.filter_by(question_id=question.id)]:
-            answer_scores.append(int(answer.score))
-        array = np.array(answer_scores)
-        # Het toevoegen het gemiddelde en de standaarddeviatie van de specifieke vraag
-        dct_questions[question].extend([round(np.average(array), 2), round(np.std(array), 2)])
+    # De links naar de vorige en volgende pagina
+    previous_url = url_for('new_study.summary_results', study_code=study_code, before=cases[0],
+                           per_page=per_page) if has_previous else None
+    next_url = url_for('new_study.summary_results', study_code=study_code, after=cases[-1],
+                       per_page=per_page) if has_next else None
 
     return render_template('new_study/summary_results.html', study_code=study_code, demographics=demographics,
                            cases=cases, dct_demographics=dct_demographics, dct_answers=dct_answers, questions=questions,
-                           dct_questions=dct_questions, study=study)
+                           dct_questions=dct_questions, study=study, previous_url=previous_url, next_url=next_url)
+
+
+# Eén pagina van de resultaten (cases x antwoorden) als JSON, met dezelfde parameters als de samenvatting ("after",
+# "before" en "per_page"). "next" geeft het Case-id waarmee de volgende pagina opgevraagd kan worden.
+@bp.route('/summary_results/<study_code>/cases', methods=['GET'])
+@login_required
+def summary_results_cases(study_code):
+    study = Study.query.filter_by(code=study_code).first()
+    # Checken of gebruiker tot betrokken onderzoekers hoort
+    if current_user not in study.linked_users:
+        return redirect(url_for('main.not_authorized'))
+
+    questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+    demographics = [demographic for demographic in Demographic.query.filter_by(questionnaire_id=questionnaire.id)]
+    questions = questionnaire_questions(questionnaire)
+
+    total_cases, has_previous, has_next, per_page = requested_case_page(questionnaire)
+    dct_demographics = summary_demographics(questionnaire, total_cases, demographics)
+    dct_answers = summary_answers(questionnaire, total_cases, questions)
+
+    return jsonify({'demographics': [demographic.name for demographic in demographics],
+                    'questions': [question.question_code for question in questions],
+                    'cases': [{'id': case.id,
+                               'demographics': dct_demographics.get(case.id, []),
+                               'answers': dct_answers.get(case.id, [])} for case in total_cases],
+                    'per_page': per_page,
+                    'previous': total_cases[0].id if has_previous else None,
+                    'next': total_cases[-1].id if has_next else None})
+
+
+# Het exporteren van alle resultaten (cases x (demografieken + vragen)) als CSV- of Excel-bestand. Het bestand wordt in
+# stukken verstuurd (zie "app/new_study/export.py").
+@bp.route('/export/<study_code>/<file_format>', methods=['GET'])
+@login_required
+def export_results(study_code, file_format):
+    study = Study.query.filter_by(code=study_code).first()
+    # Checken of gebruiker tot betrokken onderzoekers hoort
+    if current_user not in study.linked_users:
+        return redirect(url_for('main.not_authorized'))
+
+    # Checken hoe ver de studie is
+    if study.stage_1:
+        return redirect(url_for('new_study.utaut', study_code=study_code))
+
+    questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+    demographics = [demographic for demographic in Demographic.query.filter_by(questionnaire_id=questionnaire.id)]
+    questions = questionnaire_questions(questionnaire)
+    # Bij een afgerond onderzoek komen de scores van de voltooide cases uit de snapshot.
+    snapshot = None
+    if study.stage_3:
+        from app.new_study.analysis import study_snapshot
+        snapshot = study_snapshot(questionnaire, questions)
+    rows = export_rows(questionnaire, demographics, questions, snapshot)
+
+    remove = None
+    if file_format == 'csv':
+        body, mimetype = stream_with_context(csv_stream(rows)), 'text/csv'
+    elif file_format == 'xlsx':
+        body, remove = xlsx_stream(rows)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        return redirect(url_for('new_study.summary_results', study_code=study_code))
+
+    response = Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': 'attachment; filename=results_{}.{}'.format(study.id, file_format)})
+    # Het tijdelijke Excel-bestand wordt ook verwijderd als de response nooit (volledig) verstuurd wordt.
+    if remove is not None:
+        response.call_on_close(remove)
+    return response
+
+
+# De status van de laatste opdracht voor de data-analyse van het onderzoek (zie "app/analysis/jobs.py"), als JSON. De
+# pagina die op de resultaten wacht vraagt deze periodiek op.
+@bp.route('/data_analysis/<study_code>/status', methods=['GET'])
+@login_required
+def analysis_status(study_code):
+    study = Study.query.filter_by(code=study_code).first()
+    # Checken of gebruiker tot betrokken onderzoekers hoort
+    if current_user not in study.linked_users:
+        return redirect(url_for('main.not_authorized'))
+
+    job = latest_job(study)
+    if job is None:
+        return jsonify(status=None, progress=0, error=None)
+    return jsonify(status=job.status, progress=job.progress, error=job.error)
 
 
 @bp.route('/data_analysis/<study_code>', methods=['GET', 'POST'])
@@ -893,78 +932,55 @@ def data_analysis(study_code):
     model = UTAUTmodel.query.filter_by(id=study.model_id).first()
     corevariables = [corevariable for corevariable in model.linked_corevariables]
 
-    # Het opzetten van de dataframe (gebruik van plspm package en pd.dataframe met de vragenlijstresultaten)
-    list_of_questions = []
-    list_of_answers = []
-    questiongroups = [questiongroup for questiongroup in
-                      QuestionGroup.query.filter_by(questionnaire_id=questionnaire.id)]
-    for questiongroup in questiongroups:
-        questions = [question for question in Question.query.filter_by(questiongroup_id=questiongroup.id)]
-        for question in questions:
-            list_of_questions.append(question.question_code)
-            answers_question = []
-            for answer in [answer for answer in Answer.query.filter_by(question_id=question.id)]:
-                answers_question.append(answer.score)
-            list_of_answers.append(answers_question)
-
-    df = pd.DataFrame(list_of_answers).transpose()
-    df.columns = list_of_questions
-
-    structure = c.Structure()
-
-    for corevariable in corevariables:
-        influenced_variables = []
-        for relation in [relation for relation in Relation.query.filter_by(model_id=model.id)]:
-            if relation.influencer_id == corevariable.id:
-                influenced = CoreVariable.query.filter_by(id=relation.influenced_id).first()
-                influenced_variables.append(influenced.abbreviation)
-        if len(influenced_variables) > 0:
-            structure.add_path([corevariable.abbreviation], influenced_variables)
-
-    config = c.Config(structure.path(), scaled=False)
-
-    for corevariable in corevariables:
-        config.add_lv_with_columns_named(corevariable.abbreviation, Mode.A, df, corevariable.abbreviation)
-
-    plspm_calc = Plspm(df, config, Scheme.CENTROID)
-    model1 = plspm_calc.outer_model()
-
-    # Creëert dictionary met alleen loadings van latente variabele
-    # KIJKEN NAAR CODEFORMAT
-    loadings_dct = pd.DataFrame(model1['loading']).to_dict('dict')['loading']
-    for code in loadings_dct:
-        loadings_dct[code] = round(float(loadings_dct[code]), 4)
-        possible_questions = Question.query.filter_by(question_code=code)
-        actual_question = None
-        for question in possible_questions:
-            questiongroup = QuestionGroup.query.filter_by(id=question.questiongroup_id).first()
-            if questiongroup.questionnaire_id == questionnaire.id:
-                actual_question = Question.query.filter_by(questiongroup_id=questiongroup.id, question_code=code).first()
-                break
-        loadings_dct[code] = [actual_question.question, loadings_dct[code]]
-
-    # Alle data voor AVE, Cronbachs Alpha en Composite Reliability wordt hier opgesteld. Modules bovenaan geïmporteerd.
+    # De resultaten van de data-analyse (ladingen, AVE, Cronbachs Alpha, Composite Reliability, HTMT en VIF, zie
+    # "app/analysis/pipeline.py"). Bij een afgerond onderzoek worden deze niet opnieuw berekend zolang het model en de
+    # antwoorden niet veranderd zijn. Met ANALYSIS_JOBS worden ontbrekende resultaten op de achtergrond berekend en
+    # wacht de pagina daarop. De rekenmodules worden pas bij het eerste gebruik geladen (zie
+    # "app/new_study/analysis.py").
+    from app.new_study.analysis import analysis_or_job
+    result, job = analysis_or_job(study, questionnaire, model, corevariables)
+    if result is None:
+        return render_template('new_study/analysis_pending.html', title='Data-analysis', study=study, job=job)
+
+    # Creëert dictionary met alleen loadings van latente variabele, met de bijbehorende vraag.
+    questions = {question.question_code: question.question for question in questionnaire_questions(questionnaire)}
+    loadings_dct = {}
+    for code in result.loadings:
+        loadings_dct[code] = [questions[code], round(result.loadings[code], 4)]
+
+    # Alle data voor AVE, Cronbachs Alpha en Composite Reliability wordt hier opgesteld.
     data_construct_validity = {}
     for corevariable in corevariables:
-        data_construct_validity[corevariable] = [round(cronbachs_alpha(corevariable, df), 4),
-                                                 round(composite_reliability(corevariable, df, config, Scheme.CENTROID),
-                                                       4),
-                                                 round(average_variance_extracted(corevariable, df, config,
-                                                                                  Scheme.CENTROID), 4)]
-
-    # Een matrix van Heterotrait-Monotrait Ratio wordt hier beschikbaar gemaakt (module "htmt_matrix" staat bovenaan
-    # verwezen.
-    data_htmt = htmt_matrix(df, model)
+        construct = result.construct(corevariable.abbreviation)
+        data_construct_validity[corevariable] = [round(construct.cronbachs_alpha, 4),
+                                                 round(construct.composite_reliability, 4),
+                                                 round(construct.average_variance_extracted, 4)]
+
+    # Een matrix van Heterotrait-Monotrait Ratio wordt hier beschikbaar gemaakt.
+    data_htmt = result.htmt_table([corevariable.abbreviation for corevariable in corevariables])
     amount_of_variables = len(corevariables)
 
-    # Buitenste VIF-waarden worden hier beschikbaar gemaakt in een dictionary onder "data_outer_vif". Module bovenaan
-    # geïmporteerd.
-    data_outer_vif = outer_vif_values_dict(df, questionnaire)
+    # Buitenste VIF-waarden worden hier beschikbaar gemaakt in een dictionary onder "data_outer_vif", de binnenste
+    # VIF-waarden (per pad, zoals "PE -> BI") onder "data_inner_vif".
+    data_outer_vif = result.outer_vif
+    data_inner_vif = {}
+    for (influenced, values) in result.inner_vif.items():
+        for (influencer, value) in values.items():
+            data_inner_vif['{} -> {}'.format(influencer, influenced)] = value
+
+    # De significantie van de padcoëfficiënten en de betrouwbaarheidsintervallen van de HTMT-ratio's (alleen als er
+    # gebootstrapt is, zie BOOTSTRAP_SAMPLES en ANALYSIS_JOBS).
+    data_bootstrap = None
+    if result.bootstrap is not None:
+        data_bootstrap = dict(result.bootstrap)
+        for key in ['paths', 'htmt']:
+            data_bootstrap[key] = [{column: value if column == 'name' else round(value, 4)
+                                    for (column, value) in row.items()} for row in result.bootstrap[key]]
 
     return render_template('new_study/data_analysis.html', study_code=study_code,
                            data_construct_validity=data_construct_validity, data_outer_vif=data_outer_vif,
-                           data_htmt=data_htmt, amount_of_variables=amount_of_variables, study=study,
-                           loadings_dct=loadings_dct)
+                           data_inner_vif=data_inner_vif, data_htmt=data_htmt, amount_of_variables=amount_of_variables,
+                           study=study, loadings_dct=loadings_dct, data_bootstrap=data_bootstrap)
 
 
 @bp.route('/data_analysis/corevariable_analysis/<study_code>/<corevariable_id>', methods=['GET', 'POST'])
@@ -986,116 +1002,45 @@ def corevariable_analysis(study_code, corevariable_id):
     model = UTAUTmodel.query.filter_by(id=study.model_id).first()
     corevariable = CoreVariable.query.filter_by(id=corevariable_id).first()
     corevariables = [corevariable for corevariable in model.linked_corevariables]
-    questiongroups = [questiongroup for questiongroup in questionnaire.linked_questiongroups]
-
-    # De lengte van de afkorting van de kernvariabele voor het geval bepaald moet worden of een specifieke afkorting
-    # die van de relevante kernvariabele is.
-    length_abbreviation = len(corevariable.abbreviation)
 
-    # De items/vragen (de code specifiek gezegd) die horen bij de kernvariabele
-    items_lv = []
-    for questiongroup in questiongroups:
-        for question in Question.query.filter_by(questiongroup_id=questiongroup.id):
-            if question.question_code[:length_abbreviation] == corevariable.abbreviation:
-                items_lv.append(question.question_code)
+    # De resultaten van de data-analyse (dezelfde als binnen de data-analyse, zie "app/analysis/pipeline.py"). Bij een
+    # afgerond onderzoek worden deze niet opnieuw berekend zolang het model en de antwoorden niet veranderd zijn. Met
+    # ANALYSIS_JOBS worden ontbrekende resultaten op de achtergrond berekend.
+    from app.new_study.analysis import analysis_or_job
+    result, job = analysis_or_job(study, questionnaire, model, corevariables)
+    if result is None:
+        return render_template('new_study/analysis_pending.html', title='Data-analysis', study=study, job=job)
+    construct = result.construct(corevariable.abbreviation)
+
+    # De items/vragen (de code specifiek gezegd) die horen bij de kernvariabele, met hun ladingen en VIF-waarden.
+    items_lv = construct.items()
     length_items_lv = len(items_lv)
-
-    # Het opzetten van de dataframe (gebruik van plspm package en pd.dataframe met de vragenlijstresultaten)
-    list_of_questions = []
-    list_of_answers = []
-
-    for questiongroup in questiongroups:
-        questions = [question for question in Question.query.filter_by(questiongroup_id=questiongroup.id)]
-        for question in questions:
-            list_of_questions.append(question.question_code)
-            answers_question = []
-            for answer in [answer for answer in Answer.query.filter_by(question_id=question.id)]:
-                answers_question.append(answer.score)
-            list_of_answers.append(answers_question)
-    df = pd.DataFrame(list_of_answers).transpose()
-    df.columns = list_of_questions
-
-    structure = c.Structure()
-    for corevariable in corevariables:
-        influenced_variables = []
-        for relation in [relation for relation in Relation.query.filter_by(model_id=model.id)]:
-            if relation.influencer_id == corevariable.id:
-                influenced = CoreVariable.query.filter_by(id=relation.influenced_id).first()
-                influenced_variables.append(influenced.abbreviation)
-        if len(influenced_variables) > 0:
-            structure.add_path([corevariable.abbreviation], influenced_variables)
-
-    config = c.Config(structure.path(), scaled=False)
-
-    for corevariable in corevariables:
-        config.add_lv_with_columns_named(corevariable.abbreviation, Mode.A, df, corevariable.abbreviation)
-
-    plspm_calc = Plspm(df, config, Scheme.CENTROID)
-    model1 = plspm_calc.outer_model()
+    loadings_list = [construct.loadings[item] for item in items_lv]
+    corevariable_vif_js = [construct.outer_vif[item] for item in items_lv if item in construct.outer_vif]
 
     # De AVE, Cronbach's Alpha, Composite Reliability voor de fullscreen grafieken (met alle kernvariabelen erin).
-    corevariable_names_js_all = [corevariable for corevariable in model.linked_corevariables]
-    corevariable_ave_js_all = [round(average_variance_extracted(corevariable, df, config, Scheme.CENTROID), 4) for
-                               corevariable in corevariables]
-    corevariable_ca_js_all = [round(cronbachs_alpha(corevariable, df), 4) for corevariable in corevariables]
-    corevariable_cr_js_all = [round(composite_reliability(corevariable, df, config, Scheme.CENTROID), 4) for
-                              corevariable
-                              in corevariables]
-
-    # De AVE, Cronbach's Alpha, Composite Reliability, ladingen, VIF-waarden en HTMT-ratios voor de kleinere grafieken
-    # (voor AVE, CA, CR en HTMT worden de twee/drie dichtstbijzijnde kernvariabelen gebruikt).
-
-    # De indexes van de eerste dichtstbijzijnde kernvariabele, de specifieke kernvariabele en de tweede dichtstbijzijnde
-    # kernvariabele respectievelijk.
-    indexes_corevariables = []
-    for corevariable in corevariables:
-        if corevariable.id == int(corevariable_id):
-            if corevariables.index(corevariable) == 0:
-                indexes_corevariables = [0, 1, 2]
-            elif corevariables.index(corevariable) == len(corevariables) - 1:
-                indexes_corevariables = [len(corevariables) - 3, len(corevariables) - 2, len(corevariables) - 1]
-            else:
-                indexes_corevariables = [corevariables.index(corevariable) - 1, corevariables.index(corevariable),
-                                         corevariables.index(corevariable) + 1]
-
-    # Namen van de eerste dichtstbijzijnde kernvariabele, de specifieke kernvariabele en de tweede dichtstbijzijnde
-    # kernvariabele respectievelijk.
-    corevariable_names_js = [corevariable for corevariable in
-                             [corevariables[indexes_corevariables[0]], corevariables[indexes_corevariables[1]],
-                              corevariables[indexes_corevariables[2]]]]
-    # AVE-lijst
-    corevariable_ave_js = [round(average_variance_extracted(corevariable, df, config, Scheme.CENTROID), 4) for
-                           corevariable in corevariables[indexes_corevariables[0]:indexes_corevariables[2] + 1]]
-    # Cronbach's Alpha lijst
-    corevariable_ca_js = [round(cronbachs_alpha(corevariable, df), 4) for
-                          corevariable in corevariables[indexes_corevariables[0]:indexes_corevariables[2] + 1]]
-    # Composite Reliability lijst
-    corevariable_cr_js = [round(composite_reliability(corevariable, df, config, Scheme.CENTROID), 4) for
-                          corevariable in corevariables[indexes_corevariables[0]:indexes_corevariables[2] + 1]]
-
-    corevariable = CoreVariable.query.filter_by(id=corevariable_id).first()
-
-    length_corevariables = len(corevariable_names_js_all)
-
-    # VIF-waarden
-    corevariable = CoreVariable.query.filter_by(id=corevariable_id).first()
-    dct_of_all_vifs = outer_vif_values_dict(df, questionnaire)
-    corevariable_vif_js = [dct_of_all_vifs[key] for key in dct_of_all_vifs if key[:length_abbreviation] ==
-                           corevariable.abbreviation]
-
-    # HTMT-waarden
-    corevariables_htmt = corevariables
-    corevariables_htmt.remove(corevariable)
+    constructs = [result.construct(lv.abbreviation) for lv in corevariables]
+    corevariable_names_js_all = corevariables
+    length_corevariables = len(corevariables)
+    corevariable_ave_js_all = [round(lv.average_variance_extracted, 4) for lv in constructs]
+    corevariable_ca_js_all = [round(lv.cronbachs_alpha, 4) for lv in constructs]
+    corevariable_cr_js_all = [round(lv.composite_reliability, 4) for lv in constructs]
+
+    # De AVE, Cronbach's Alpha en Composite Reliability voor de kleinere grafieken, met de kernvariabele en de twee
+    # dichtstbijzijnde kernvariabelen.
+    corevariable_names_js = neighbouring_corevariables(corevariables, corevariable)
+    neighbours = [result.construct(lv.abbreviation) for lv in corevariable_names_js]
+    corevariable_ave_js = [round(lv.average_variance_extracted, 4) for lv in neighbours]
+    corevariable_ca_js = [round(lv.cronbachs_alpha, 4) for lv in neighbours]
+    corevariable_cr_js = [round(lv.composite_reliability, 4) for lv in neighbours]
+
+    # HTMT-waarden van de kernvariabele met alle andere kernvariabelen (de eerste drie voor de kleinere grafiek).
+    corevariables_htmt = [lv for lv in corevariables if lv != corevariable]
     length_corevariables_htmt = len(corevariables_htmt)
-    corevariable_names_htmt_js = corevariables_htmt[:3]
-    corevariable_htmt_js = [round(heterotrait_monotrait(corevariable, lv, correlation_matrix(df), df), 4)
-                            for lv in corevariables_htmt[:3]]
-    corevariable_htmt_js_all = [round(heterotrait_monotrait(corevariable, lv, correlation_matrix(df), df), 4)
+    corevariable_htmt_js_all = [round(result.htmt_ratio(corevariable.abbreviation, lv.abbreviation), 4)
                                 for lv in corevariables_htmt]
-
-    # Ladingen van de items
-    loadings_dct = pd.DataFrame(model1['loading']).to_dict('dict')['loading']
-    loadings_list = [loadings_dct[item] for item in items_lv]
+    corevariable_names_htmt_js = corevariables_htmt[:3]
+    corevariable_htmt_js = corevariable_htmt_js_all[:3]
 
     return render_template('new_study/corevariable_analysis.html', study_code=study_code, corevariable=corevariable,
                            corevariables=corevariables, corevariable_names_js=corevariable_names_js,
@@ -0,0 +1,187 @@
+import os
+import pickle
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from flask.sessions import SessionInterface
+from flask_session.sessions import ServerSideSession, FileSystemSessionInterface
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import SessionData
+
+# De opslag van de sessies is in te stellen met SESSION_TYPE:
+# - "filesystem": de bestanden in SESSION_FILE_DIR (via Flask-Session);
+# - "sqlalchemy": de tabel "session_data" in de database van de applicatie;
+# - "memory": een LRU-cache binnen het proces (alleen geschikt als de applicatie in één proces draait).
+# Een sessie wordt alleen opgeslagen als deze gewijzigd is, of bij een permanente sessie met
+# SESSION_REFRESH_EACH_REQUEST (zie "should_set_cookie"). Bij iedere opslag verloopt de sessie na
+# PERMANENT_SESSION_LIFETIME. Verlopen sessies worden bij het openen genegeerd en met "flask sessions gc" in één keer
+# verwijderd (zie "app/cli.py").
+
+
+# De basis voor de eigen opslagmethoden: het openen en opslaan van de sessie (en de cookie met het sessie-id). De
+# subklassen geven aan hoe de gegevens van een sessie geladen, opgeslagen en verwijderd worden.
+class ServerSessionInterface(SessionInterface):
+    def open_session(self, app, request):
+        sid = request.cookies.get(app.config['SESSION_COOKIE_NAME'])
+        if sid:
+            data = self.load(sid)
+            if data is not None:
+                return ServerSideSession(data, sid=sid)
+        return ServerSideSession(sid=str(uuid.uuid4()), permanent=app.config['SESSION_PERMANENT'])
+
+    def save_session(self, app, session, response):
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        # Een lege sessie wordt niet opgeslagen (en een geleegde sessie verwijderd).
+        if not session:
+            if session.modified:
+                self.delete(session.sid)
+                response.delete_cookie(app.config['SESSION_COOKIE_NAME'], domain=domain, path=path)
+            return
+
+        # Een ongewijzigde sessie hoeft niet opnieuw opgeslagen te worden (en de cookie niet opnieuw gezet).
+        if not self.should_set_cookie(app, session):
+            return
+
+        self.store(session.sid, dict(session), app.permanent_session_lifetime)
+        response.set_cookie(app.config['SESSION_COOKIE_NAME'], session.sid,
+                            expires=self.get_expiration_time(app, session), httponly=self.get_cookie_httponly(app),
+                            domain=domain, path=path, secure=self.get_cookie_secure(app),
+                            samesite=self.get_cookie_samesite(app))
+
+    def load(self, sid):
+        raise NotImplementedError
+
+    # De sessie wordt opgeslagen tot "lifetime" (een timedelta) na nu.
+    def store(self, sid, data, lifetime):
+        raise NotImplementedError
+
+    def delete(self, sid):
+        raise NotImplementedError
+
+    # Het verwijderen van alle verlopen sessies. Geeft het aantal verwijderde sessies.
+    def collect_expired(self):
+        raise NotImplementedError
+
+
+# De sessies in de tabel "session_data" van de database.
+class SqlAlchemySessionInterface(ServerSessionInterface):
+    def load(self, sid):
+        saved = db.session.query(SessionData.data).filter(SessionData.session_id == sid,
+                                                          SessionData.expiry > datetime.utcnow()).scalar()
+        if saved is None:
+            return None
+        try:
+            return pickle.loads(saved)
+        except Exception:
+            return None
+
+    # Het opslaan gebeurt in een eigen transactie, los van "db.session": een commit van de sessie mag geen (half
+    # afgemaakte) wijzigingen van het verzoek zelf meenemen. Voegt een gelijktijdig verzoek tussendoor dezelfde sessie
+    # toe, dan wordt deze alsnog bijgewerkt.
+    def store(self, sid, data, lifetime):
+        values = {'data': pickle.dumps(data, pickle.HIGHEST_PROTOCOL), 'expiry': datetime.utcnow() + lifetime}
+        table = SessionData.__table__
+        try:
+            with db.engine.begin() as connection:
+                if not connection.execute(table.update().where(table.c.session_id == sid).values(values)).rowcount:
+                    connection.execute(table.insert().values(session_id=sid, **values))
+        except IntegrityError:
+            with db.engine.begin() as connection:
+                connection.execute(table.update().where(table.c.session_id == sid).values(values))
+
+    def delete(self, sid):
+        table = SessionData.__table__
+        with db.engine.begin() as connection:
+            connection.execute(table.delete().where(table.c.session_id == sid))
+
+    def collect_expired(self):
+        removed = SessionData.query.filter(SessionData.expiry <= datetime.utcnow()).delete(synchronize_session=False)
+        db.session.commit()
+        return removed
+
+
+# De sessies in een LRU-cache binnen het proces: bij meer dan "size" sessies wordt de langst niet gebruikte sessie
+# verwijderd. De gegevens hoeven hierdoor niet bij ieder verzoek naar een bestand of de database geschreven te worden.
+class MemorySessionInterface(ServerSessionInterface):
+    def __init__(self, size):
+        self.size = size
+        self.sessions = OrderedDict()
+        self.lock = Lock()
+
+    def load(self, sid):
+        with self.lock:
+            saved = self.sessions.get(sid)
+            if saved is None:
+                return None
+            if saved[0] <= time.time():
+                del self.sessions[sid]
+                return None
+            self.sessions.move_to_end(sid)
+            return dict(saved[1])
+
+    def store(self, sid, data, lifetime):
+        with self.lock:
+            self.sessions[sid] = (time.time() + lifetime.total_seconds(), data)
+            self.sessions.move_to_end(sid)
+            while len(self.sessions) > self.size:
+                self.sessions.popitem(last=False)
+
+    def delete(self, sid):
+        with self.lock:
+            self.sessions.pop(sid, None)
+
+    def collect_expired(self):
+        now = time.time()
+        with self.lock:
+            expired = [sid for (sid, (expires, data)) in self.sessions.items() if expires <= now]
+            for sid in expired:
+                del self.sessions[sid]
+        return len(expired)
+
+
+# Het verwijderen van de verlopen sessiebestanden van Flask-Session. Ieder bestand begint met het tijdstip waarop de
+# sessie verloopt (0 voor bestanden die niet verlopen).
+def collect_expired_files(directory):
+    removed = 0
+    now = time.time()
+    if not os.path.isdir(directory):
+        return removed
+
+    for filename in os.listdir(directory):
+        path = os.path.join(directory, filename)
+        try:
+            with open(path, 'rb') as file:
+                expires = pickle.load(file)
+            if expires != 0 and expires < now:
+                os.remove(path)
+                removed += 1
+        except (OSError, EOFError, pickle.UnpicklingError):
+            continue
+    return removed
+
+
+# Het instellen van de opslag van de sessies volgens SESSION_TYPE. Alle andere opslagmethoden worden aan Flask-Session
+# overgelaten.
+def init_session(app, session):
+    session_type = app.config['SESSION_TYPE']
+    if session_type == 'sqlalchemy':
+        app.session_interface = SqlAlchemySessionInterface()
+    elif session_type == 'memory':
+        app.session_interface = MemorySessionInterface(app.config['SESSION_MEMORY_SIZE'])
+    else:
+        session.init_app(app)
+
+
+# Het verwijderen van alle verlopen sessies van de applicatie. Geeft het aantal verwijderde sessies.
+def collect_expired_sessions(app):
+    interface = app.session_interface
+    if isinstance(interface, ServerSessionInterface):
+        return interface.collect_expired()
+    if isinstance(interface, FileSystemSessionInterface):
+        return collect_expired_files(app.config['SESSION_FILE_DIR'])
+    return 0
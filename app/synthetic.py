@@ -0,0 +1,134 @@
+import uuid
+
+import numpy as np
+
+from app import db
+from app.models import Study, UTAUTmodel, CoreVariable, Relation, Questionnaire, QuestionGroup, Question, \
+    QuestionType, Demographic, Case, Answer, DemographicAnswer
+
+# Synthetische onderzoeken om de trage onderdelen (de samenvatting, de data-analyse en de vragenlijst) op verschillende
+# schalen te kunnen meten (zie "flask synthetic study" en "benchmarks/"). Alles wordt via de bestaande modellen
+# aangemaakt, zodat een synthetisch onderzoek niet te onderscheiden is van een echt onderzoek.
+
+# Het aantal rijen per bulk insert.
+CHUNK_SIZE = 10000
+LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+# De afkortingen van de synthetische kernvariabelen: "SV" gevolgd door twee letters (SVAA, SVAB, ...). Omdat alle
+# afkortingen even lang zijn is geen afkorting het begin van een andere, waardoor de items (SVAA1, SVAA2, ...) eenduidig
+# bij één kernvariabele horen.
+def synthetic_abbreviations(amount):
+    if amount > len(LETTERS) ** 2:
+        raise ValueError('At most {} synthetic core variables are possible'.format(len(LETTERS) ** 2))
+    return ['SV' + LETTERS[index // len(LETTERS)] + LETTERS[index % len(LETTERS)] for index in range(amount)]
+
+
+# De scores van de cases (rijen) op de items (kolommen, per kernvariabele "items" items achter elkaar). De latente
+# variabelen vormen een keten: iedere kernvariabele wordt door de vorige beïnvloed met (gestandaardiseerde)
+# padcoëfficiënt "path". Ieder item is de latente variabele met lading "loading" plus ruis, omgezet naar de schaal van
+# de vragenlijst (1 tot en met "scale", met het midden van de schaal als gemiddelde).
+def synthetic_scores(cases, corevariables, items, loading=0.8, path=0.5, scale=5, random=None):
+    if not 0 <= loading <= 1 or not 0 <= path <= 1:
+        raise ValueError('loading and path must be between 0 and 1')
+    random = random if random is not None else np.random.default_rng()
+
+    latent = np.empty((cases, corevariables))
+    latent[:, 0] = random.standard_normal(cases)
+    for index in range(1, corevariables):
+        latent[:, index] = path * latent[:, index - 1] + np.sqrt(1 - path ** 2) * random.standard_normal(cases)
+
+    values = loading * latent[:, :, np.newaxis] + \
+        np.sqrt(1 - loading ** 2) * random.standard_normal((cases, corevariables, items))
+    scores = np.clip(np.rint((scale + 1) / 2 + values * (scale - 1) / 4), 1, scale).astype(int)
+    return scores.reshape(cases, corevariables * items)
+
+
+# Het in stukken van CHUNK_SIZE toevoegen van de rijen (dictionaries) aan de tabel van het model.
+def bulk_insert(model, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.bulk_insert_mappings(model, rows[start:start + CHUNK_SIZE])
+
+
+# Een volledig synthetisch onderzoek: een onderzoeksmodel met "corevariables" kernvariabelen (in een keten van
+# relaties), een vragenlijst met "items" vragen per kernvariabele en "demographics" demografieken, en "cases" voltooide
+# cases met antwoorden volgens "synthetic_scores". Het onderzoek staat in de gegeven stage (1, 2 of 3) en wordt, als
+# "user" gegeven is, aan die gebruiker gekoppeld.
+def generate_study(name=None, corevariables=6, items=4, cases=500, demographics=2, loading=0.8, path=0.5, scale=5,
+                   stage=3, user=None, seed=None):
+    if stage not in (1, 2, 3):
+        raise ValueError('stage must be 1, 2 or 3')
+    random = np.random.default_rng(seed)
+
+    # Het onderzoeksmodel met de kernvariabelen (bestaande kernvariabelen met dezelfde afkorting worden hergebruikt) en
+    # de relaties tussen opeenvolgende kernvariabelen.
+    model = UTAUTmodel(name='Synthetic')
+    db.session.add(model)
+    db.session.commit()
+    linked_corevariables = []
+    for abbreviation in synthetic_abbreviations(corevariables):
+        corevariable = CoreVariable.query.filter_by(abbreviation=abbreviation).first()
+        if corevariable is None:
+            corevariable = CoreVariable(name='Synthetic variable {}'.format(abbreviation[2:]),
+                                        abbreviation=abbreviation)
+            db.session.add(corevariable)
+            db.session.commit()
+        corevariable.link(model)
+        linked_corevariables.append(corevariable)
+    for (influencer, influenced) in zip(linked_corevariables, linked_corevariables[1:]):
+        db.session.add(Relation(model_id=model.id, influencer_id=influencer.id, influenced_id=influenced.id))
+    db.session.commit()
+
+    study = Study(name=name or 'Synthetic study {}'.format(uuid.uuid4().hex[:8]),
+                  description='Synthetic study with {} cases'.format(cases), technology='Synthetic',
+                  model_id=model.id, stage_1=stage == 1, stage_2=stage == 2, stage_3=stage == 3)
+    study.create_code()
+    db.session.add(study)
+    db.session.commit()
+    if user is not None:
+        user.link(study)
+        db.session.commit()
+
+    # De vragenlijst met een vragengroep per kernvariabele en de demografieken (met keuzes).
+    questionnaire = Questionnaire(name=study.name, study_id=study.id, scale=scale)
+    db.session.add(questionnaire)
+    db.session.commit()
+    question_ids = []
+    for corevariable in linked_corevariables:
+        questiongroup = QuestionGroup(title=corevariable.name, group_type='likert', questionnaire_id=questionnaire.id,
+                                      corevariable_id=corevariable.id)
+        db.session.add(questiongroup)
+        db.session.commit()
+        questions = [Question(question='Statement {} about {}'.format(index, corevariable.name),
+                              question_code='{}{}'.format(corevariable.abbreviation, index),
+                              questiongroup_id=questiongroup.id) for index in range(1, items + 1)]
+        db.session.add_all(questions)
+        db.session.commit()
+        question_ids += [question.id for question in questions]
+
+    if QuestionType.query.get('radio') is None:
+        db.session.add(QuestionType(name='radio'))
+    choices = ['A', 'B', 'C']
+    demographic_rows = [Demographic(name='Demographic {}'.format(index), choices=','.join(choices), optional=False,
+                                    questiontype_name='radio', questionnaire_id=questionnaire.id)
+                        for index in range(1, demographics + 1)]
+    db.session.add_all(demographic_rows)
+    db.session.commit()
+
+    # De cases met hun antwoorden en demografische antwoorden, met bulk inserts.
+    bulk_insert(Case, [{'session_id': '{}-{}'.format(study.code, index), 'questionnaire_id': questionnaire.id,
+                        'completed': True} for index in range(cases)])
+    case_ids = [case_id for (case_id,) in db.session.query(Case.id).filter_by(questionnaire_id=questionnaire.id)
+                .order_by(Case.id)]
+    scores = synthetic_scores(cases, corevariables, items, loading, path, scale, random)
+    bulk_insert(Answer, [{'score': int(scores[row, column]), 'question_id': question_id, 'case_id': case_id}
+                         for (row, case_id) in enumerate(case_ids)
+                         for (column, question_id) in enumerate(question_ids)])
+    given = random.integers(0, len(choices), size=(cases, demographics))
+    bulk_insert(DemographicAnswer, [{'answer': choices[given[row, column]], 'demographic_id': demographic.id,
+                                     'case_id': case_id}
+                                    for (row, case_id) in enumerate(case_ids)
+                                    for (column, demographic) in enumerate(demographic_rows)])
+    db.session.commit()
+
+    return study
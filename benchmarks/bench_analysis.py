@@ -0,0 +1,213 @@
+# Benchmark van de samenvatting van de resultaten, de data-analyse, de analyse per kernvariabele en het invullen van de
+# vragenlijst door een participant, op verschillende schalen (aantallen cases). Per schaal worden synthetische
+# onderzoeken gegenereerd (zie "app/synthetic.py") in een tijdelijke SQLite-database. Per pagina worden de tijd (de
+# beste van een aantal herhalingen) en het aantal queries vastgelegd.
+#
+# Met --output worden de resultaten als JSON opgeslagen; met --baseline worden ze vergeleken met eerder opgeslagen
+# resultaten. Een pagina die meer queries gebruikt, of meer dan --tolerance langzamer is, geldt als regressie (en het
+# script eindigt dan met exitcode 1).
+#
+# Gebruik (vanuit de hoofdmap van de repository):
+#     python benchmarks/bench_analysis.py --scales 200,1000,5000 --output baseline.json
+#     python benchmarks/bench_analysis.py --scales 200,1000,5000 --baseline baseline.json
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from flask import url_for
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from app import create_app, db
+from app.main.functions import questionnaire_definition
+from app.models import User, UTAUTmodel, AnalysisCache
+from app.synthetic import generate_study
+from config import Config
+
+
+class BenchmarkConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SESSION_TYPE = 'memory'
+
+
+# Het aantal queries binnen een blok code, via een listener op de engine.
+class QueryCounter(object):
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(db.engine, 'before_cursor_execute', self.record)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(db.engine, 'before_cursor_execute', self.record)
+
+    def record(self, *args):
+        self.count += 1
+
+
+# De beste tijd (in seconden) en het aantal queries van "repeat" keer uitvoeren. Met "prepare" wordt vóór iedere keer
+# (buiten de meting om) de uitgangssituatie hersteld.
+def measure(function, repeat, prepare=None):
+    best, queries = float('inf'), 0
+    for iteration in range(repeat):
+        if prepare is not None:
+            prepare()
+        db.session.remove()
+        with QueryCounter() as counter:
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+        queries = counter.count
+    return {'seconds': best, 'queries': queries}
+
+
+# De URL van een endpoint van de applicatie.
+def endpoint_url(app, endpoint, **values):
+    with app.test_request_context():
+        return url_for(endpoint, **values)
+
+
+# Een GET-verzoek als ingelogde onderzoeker; een andere statuscode dan 200 betekent dat de pagina niet gemeten kan
+# worden.
+def researcher_page(client, url):
+    def request():
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError('{} returned {}'.format(url, response.status_code))
+    return request
+
+
+# Het volledig invullen van de vragenlijst door een nieuwe participant: de introductie, de demografieken, alle
+# vragengroepen en het versturen op de eindpagina.
+def respondent_flow(app, study_code):
+    definition = questionnaire_definition(study_code)
+    demographics = {demographic.name: 'A' for demographic in definition.demographics}
+    groups = [{question.question: '3' for question in definition.questiongroups[questiongroup_id].questions}
+              for questiongroup_id in definition.questiongroup_ids]
+
+    intro = endpoint_url(app, 'main.intro_questionlist', study_code=study_code)
+    start = endpoint_url(app, 'main.start_questionlist', study_code=study_code)
+    pages = [endpoint_url(app, 'main.questionlist', study_code=study_code, questionlist_number=number)
+             for number in range(len(groups))]
+    ending = endpoint_url(app, 'main.ending_questionlist', study_code=study_code)
+
+    def flow():
+        client = app.test_client()
+        client.get(intro)
+        client.post(start, data=dict(demographics, submit='y'))
+        for (page, answers) in zip(pages, groups):
+            client.post(page, data=dict(answers, submit='y'))
+        response = client.post(ending, data={'submit': 'y'})
+        if b'Thank you' not in response.data:
+            raise RuntimeError('the questionnaire was not submitted')
+    return flow
+
+
+# Alle metingen op één schaal: een afgerond onderzoek (stage_3) voor de pagina's van de onderzoeker en een lopend
+# onderzoek (stage_2) voor de vragenlijst, beide met "cases" cases. Tussen de metingen wordt de sessie van de database
+# opgeruimd, waardoor alleen id's en codes (en geen objecten uit de database) bewaard worden.
+def run_scale(app, researcher_id, cases, arguments):
+    settings = dict(corevariables=arguments.corevariables, items=arguments.items, cases=cases,
+                    user=User.query.get(researcher_id), seed=arguments.seed)
+    study = generate_study(stage=3, **settings)
+    study_id, study_code = study.id, study.code
+    running_study_code = generate_study(stage=2, **settings).code
+    corevariable_id = UTAUTmodel.query.get(study.model_id).linked_corevariables.first().id
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(researcher_id)
+        session['_fresh'] = True
+
+    def forget_results():
+        AnalysisCache.query.filter_by(study_id=study_id).delete()
+        db.session.commit()
+
+    summary_results = endpoint_url(app, 'new_study.summary_results', study_code=study_code)
+    data_analysis = endpoint_url(app, 'new_study.data_analysis', study_code=study_code)
+    corevariable_analysis = endpoint_url(app, 'new_study.corevariable_analysis', study_code=study_code,
+                                         corevariable_id=corevariable_id)
+    return {
+        'summary_results': measure(researcher_page(client, summary_results), arguments.repeat),
+        'data_analysis (uncached)': measure(researcher_page(client, data_analysis), arguments.repeat, forget_results),
+        'data_analysis': measure(researcher_page(client, data_analysis), arguments.repeat),
+        'corevariable_analysis': measure(researcher_page(client, corevariable_analysis), arguments.repeat),
+        'respondent_flow': measure(respondent_flow(app, running_study_code), arguments.repeat)}
+
+
+# De regressies ten opzichte van de baseline, als tekstregels.
+def regressions(results, baseline, tolerance):
+    found = []
+    for (scale, pages) in results.items():
+        for (page, result) in pages.items():
+            previous = baseline.get(scale, {}).get(page)
+            if previous is None:
+                continue
+            if result['queries'] > previous['queries']:
+                found.append('{} cases, {}: {} queries (was {})'.format(scale, page, result['queries'],
+                                                                       previous['queries']))
+            if result['seconds'] > previous['seconds'] * (1 + tolerance):
+                found.append('{} cases, {}: {:.1f} ms (was {:.1f} ms)'.format(
+                    scale, page, result['seconds'] * 1000, previous['seconds'] * 1000))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analysis pages and the respondent flow.')
+    parser.add_argument('--scales', default='200,1000,5000', help='Comma separated numbers of cases.')
+    parser.add_argument('--corevariables', type=int, default=6, help='Number of core variables per study.')
+    parser.add_argument('--items', type=int, default=4, help='Number of items per core variable.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs per page (the best run counts).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic answers.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--baseline', help='Compare the results with this JSON file.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown per page.')
+    arguments = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    BenchmarkConfig.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    app = create_app(BenchmarkConfig)
+    try:
+        with app.app_context():
+            db.create_all()
+            researcher = User(username='benchmark', email='benchmark@example.com')
+            researcher.set_password('benchmark')
+            db.session.add(researcher)
+            db.session.commit()
+            researcher_id = researcher.id
+
+            results = {}
+            for cases in [int(scale) for scale in arguments.scales.split(',')]:
+                results[str(cases)] = run_scale(app, researcher_id, cases, arguments)
+
+            print('{:>8}  {:<26}{:>12}{:>10}'.format('cases', 'page', 'time (ms)', 'queries'))
+            for (scale, pages) in results.items():
+                for (page, result) in pages.items():
+                    print('{:>8}  {:<26}{:>12.1f}{:>10}'.format(scale, page, result['seconds'] * 1000,
+                                                                result['queries']))
+            db.session.remove()
+    finally:
+        os.remove(path)
+
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            found = regressions(results, json.load(file), arguments.tolerance)
+        for regression in found:
+            print('REGRESSION ' + regression)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# Benchmark van het bootstrappen van het padmodel (zie "app/analysis/bootstrap.py") met verschillende aantallen
+# processen, op een synthetisch onderzoek (zie "app/synthetic.py") in een tijdelijke SQLite-database. Per aantal
+# processen worden de tijd, het aantal steekproeven per seconde en de versnelling ten opzichte van één proces gegeven.
+# Daarnaast wordt gecontroleerd dat de uitkomst niet afhangt van het aantal processen.
+#
+# Gebruik (vanuit de hoofdmap van de repository):
+#     python benchmarks/bench_bootstrap.py --samples 500 --workers 1,2,4,8
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from app import create_app, db
+from app.analysis.bootstrap import bootstrap
+from app.analysis.dataset import load_dataset
+from app.models import Questionnaire, UTAUTmodel, Relation
+from app.synthetic import generate_study
+from config import Config
+
+
+class BenchmarkConfig(Config):
+    TESTING = True
+    SESSION_TYPE = 'memory'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the parallel bootstrap of the path model.')
+    parser.add_argument('--samples', type=int, default=500, help='Number of bootstrap samples.')
+    parser.add_argument('--workers', default='1,2,4', help='Comma separated numbers of worker processes.')
+    parser.add_argument('--cases', type=int, default=1000, help='Number of cases of the synthetic study.')
+    parser.add_argument('--corevariables', type=int, default=6, help='Number of core variables.')
+    parser.add_argument('--items', type=int, default=4, help='Number of items per core variable.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic answers and the bootstrap.')
+    arguments = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    BenchmarkConfig.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    app = create_app(BenchmarkConfig)
+    try:
+        with app.app_context():
+            db.create_all()
+            study = generate_study(corevariables=arguments.corevariables, items=arguments.items,
+                                   cases=arguments.cases, seed=arguments.seed)
+            dataset = load_dataset(Questionnaire.query.filter_by(study_id=study.id).first())
+            model = UTAUTmodel.query.get(study.model_id)
+            corevariables = list(model.linked_corevariables)
+            relations = Relation.query.filter_by(model_id=model.id).all()
+
+            print('{} samples, {} cases, {} cpus'.format(arguments.samples, arguments.cases, os.cpu_count()))
+            print('{:>8}{:>12}{:>14}{:>10}'.format('workers', 'time (s)', 'samples/s', 'speedup'))
+            reference, single = None, None
+            for workers in [int(number) for number in arguments.workers.split(',')]:
+                start = time.perf_counter()
+                results = bootstrap(dataset, corevariables, relations, samples=arguments.samples, workers=workers,
+                                    seed=arguments.seed)
+                seconds = time.perf_counter() - start
+                single = single or seconds
+                print('{:>8}{:>12.2f}{:>14.1f}{:>10.2f}'.format(workers, seconds, arguments.samples / seconds,
+                                                                 single / seconds))
+                if reference is None:
+                    reference = results
+                elif not (reference.paths.equals(results.paths) and reference.htmt.equals(results.htmt)):
+                    print('WARNING the results with {} workers differ'.format(workers))
+            print(reference.paths.round(4).to_string())
+            db.session.remove()
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# Benchmark van het laden van de dataset van een afgerond onderzoek: het omzetten van alle losse antwoorden (Answer)
+# naar een matrix ("pivot_answers") tegenover het lezen van de brede blobs (CaseResponse, zie
+# "app/analysis/responses.py") en het openen van de snapshot (zie "app/analysis/snapshot.py"), op een synthetisch
+# onderzoek (zie "app/synthetic.py") in een tijdelijke SQLite-database. Het eenmalig maken van de blobs en het schrijven
+# van de snapshot worden apart gemeten. Daarnaast wordt gecontroleerd dat alle manieren dezelfde matrix geven.
+#
+# Gebruik (vanuit de hoofdmap van de repository):
+#     python benchmarks/bench_dataset.py --cases 20000 --corevariables 6 --items 5
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from app import create_app, db
+from app.analysis.dataset import answer_rows, pivot_answers, response_matrix, save_snapshot, valid_snapshot
+from app.analysis.questions import questionnaire_questions
+from app.analysis.responses import MISSING, materialize_responses
+from app.models import Questionnaire
+from app.synthetic import generate_study
+from config import Config
+
+
+class BenchmarkConfig(Config):
+    TESTING = True
+    SESSION_TYPE = 'memory'
+
+
+# De beste tijd (in seconden) en de uitkomst van "repeat" keer uitvoeren.
+def measure(function, repeat):
+    best, result = float('inf'), None
+    for iteration in range(repeat):
+        db.session.remove()
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark loading the answer matrix of a finished study.')
+    parser.add_argument('--cases', type=int, default=20000, help='Number of cases of the synthetic study.')
+    parser.add_argument('--corevariables', type=int, default=6, help='Number of core variables.')
+    parser.add_argument('--items', type=int, default=5, help='Number of items per core variable.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs (the best run counts).')
+    arguments = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    BenchmarkConfig.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    BenchmarkConfig.SNAPSHOT_FOLDER = tempfile.mkdtemp()
+    app = create_app(BenchmarkConfig)
+    try:
+        with app.app_context():
+            db.create_all()
+            study = generate_study(corevariables=arguments.corevariables, items=arguments.items,
+                                   cases=arguments.cases, stage=3, seed=0)
+            questionnaire_id = Questionnaire.query.filter_by(study_id=study.id).first().id
+
+            def question_ids():
+                questionnaire = Questionnaire.query.get(questionnaire_id)
+                return questionnaire, [question.id for question in questionnaire_questions(questionnaire)]
+
+            def pivot():
+                questionnaire, ids = question_ids()
+                return pivot_answers(answer_rows(questionnaire), ids)
+
+            def wide():
+                questionnaire, ids = question_ids()
+                return response_matrix(questionnaire, ids)
+
+            def mapped():
+                questionnaire, ids = question_ids()
+                snapshot = valid_snapshot(questionnaire, ids)
+                return snapshot.case_ids, np.where(snapshot.scores == MISSING, np.nan, snapshot.scores)
+
+            start = time.perf_counter()
+            materialize_responses(questionnaire_id)
+            materialize_seconds = time.perf_counter() - start
+            pivot_seconds, (pivot_cases, pivot_matrix) = measure(pivot, arguments.repeat)
+            wide_seconds, (wide_cases, wide_matrix) = measure(wide, arguments.repeat)
+            start = time.perf_counter()
+            save_snapshot(Questionnaire.query.get(questionnaire_id))
+            snapshot_seconds = time.perf_counter() - start
+            mapped_seconds, (mapped_cases, mapped_matrix) = measure(mapped, arguments.repeat)
+            db.session.remove()
+    finally:
+        os.remove(path)
+        shutil.rmtree(BenchmarkConfig.SNAPSHOT_FOLDER)
+
+    print('{} cases x {} items'.format(arguments.cases, arguments.corevariables * arguments.items))
+    print('{:<28}{:>12.1f} ms'.format('materialize (once)', materialize_seconds * 1000))
+    print('{:<28}{:>12.1f} ms'.format('pivot over Answer', pivot_seconds * 1000))
+    print('{:<28}{:>12.1f} ms'.format('read CaseResponse', wide_seconds * 1000))
+    print('{:<28}{:>12.1f} ms'.format('write snapshot (once)', snapshot_seconds * 1000))
+    print('{:<28}{:>12.1f} ms'.format('open snapshot (memmap)', mapped_seconds * 1000))
+    for (cases, matrix) in [(wide_cases, wide_matrix), (mapped_cases, mapped_matrix)]:
+        if not (np.array_equal(pivot_cases, cases) and np.array_equal(pivot_matrix, matrix, equal_nan=True)):
+            print('FAILED the matrices differ')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+# Benchmark van de indexen op de veelgebruikte queries (zie migratie "c4a8e1f0b6d2_indexes"). Er wordt een tijdelijke
+# SQLite-database gevuld met een aantal synthetische onderzoeken (zie "app/synthetic.py"), waarna de queries van de
+# samenvatting, de dataset, de export en de vragenlijst eerst zonder en daarna met de indexen uitgevoerd worden. Per
+# query worden de tijd (de beste van een aantal herhalingen) en het query plan van SQLite weergegeven.
+#
+# Gebruik (vanuit de hoofdmap van de repository):
+#     python benchmarks/bench_indexes.py --studies 20 --cases 1000 --corevariables 6 --items 5
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from app import create_app, db
+from app.analysis.dataset import load_dataset
+from app.main.functions import questionnaire_definition, forget_questionnaire_definition
+from app.models import Questionnaire, QuestionGroup, Question, Demographic
+from app.new_study.export import export_rows
+from app.new_study.functions import case_page, summary_answers, summary_demographics, summary_statistics
+from app.synthetic import generate_study
+from config import Config
+
+# De indexen uit de migratie "c4a8e1f0b6d2_indexes".
+INDEXES = ['ix_answer_case_id', 'ix_answer_question_id_case_id_score', 'ix_case_questionnaire_id',
+           'ix_demographic_questionnaire_id', 'ix_demographic_answer_case_id', 'ix_demographic_answer_demographic_id',
+           'ix_question_question_code', 'ix_question_questiongroup_id', 'ix_question_group_questionnaire_id',
+           'ix_questionnaire_study_id', 'ix_relation_model_id']
+
+
+class BenchmarkConfig(Config):
+    TESTING = True
+    SESSION_TYPE = 'memory'
+
+
+# De queries die gemeten worden, als functies zonder argumenten.
+def hot_queries(study, questionnaire):
+    questions = Question.query.join(QuestionGroup, Question.questiongroup_id == QuestionGroup.id) \
+        .filter(QuestionGroup.questionnaire_id == questionnaire.id).order_by(Question.id).all()
+    demographics = Demographic.query.filter_by(questionnaire_id=questionnaire.id).all()
+
+    def summary_page():
+        cases, has_previous, has_next = case_page(questionnaire, after=None, per_page=50)
+        summary_demographics(questionnaire, cases, demographics)
+        summary_answers(questionnaire, cases, questions)
+
+    def definition():
+        forget_questionnaire_definition(study.code)
+        questionnaire_definition(study.code)
+
+    return [('load_dataset', lambda: load_dataset(questionnaire)),
+            ('summary_statistics', lambda: summary_statistics(questionnaire, questions)),
+            ('summary_page', summary_page),
+            ('completed_cases', questionnaire.total_completed_cases),
+            ('questionnaire_definition', definition),
+            ('export_rows', lambda: sum(1 for row in export_rows(questionnaire, demographics, questions)))]
+
+
+# De beste tijd (in seconden) van "repeat" keer uitvoeren, en de SQL-statements (met parameters) van de laatste keer.
+def measure(function, repeat):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    best = float('inf')
+    for iteration in range(repeat):
+        del statements[:]
+        db.session.expire_all()
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    return best, statements
+
+
+# Het query plan van SQLite voor ieder (uniek) statement.
+def query_plans(statements):
+    plans = []
+    for (statement, parameters) in statements:
+        rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        plan = [row[-1] for row in rows]
+        if plan not in plans:
+            plans.append(plan)
+    return plans
+
+
+# Het verwijderen of (opnieuw) aanmaken van de indexen uit INDEXES, waarna SQLite de statistieken voor de planner
+# bijwerkt.
+def set_indexes(create):
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in INDEXES:
+                if create:
+                    index.create(bind=db.engine, checkfirst=True)
+                else:
+                    db.session.connection().exec_driver_sql('DROP INDEX IF EXISTS "{}"'.format(index.name))
+    db.session.commit()
+    db.session.connection().exec_driver_sql('ANALYZE')
+    db.session.commit()
+
+
+# Het meten van alle queries, met (optioneel) de query plans.
+def run(phase, queries, repeat, show_plans):
+    timings = {}
+    for (name, function) in queries:
+        timings[name], statements = measure(function, repeat)
+        if show_plans:
+            print('--- {} ({})'.format(name, phase))
+            for plan in query_plans(statements):
+                print('    ' + ' | '.join(plan))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the database indexes on the hot query paths.')
+    parser.add_argument('--studies', type=int, default=20, help='Number of synthetic studies in the database.')
+    parser.add_argument('--cases', type=int, default=1000, help='Number of completed cases per study.')
+    parser.add_argument('--corevariables', type=int, default=6, help='Number of core variables per study.')
+    parser.add_argument('--items', type=int, default=5, help='Number of items per core variable.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs per query (the best run counts).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic answers.')
+    parser.add_argument('--no-plans', action='store_true', help='Do not print the query plans.')
+    arguments = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    BenchmarkConfig.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    app = create_app(BenchmarkConfig)
+    try:
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            for number in range(arguments.studies):
+                study = generate_study(name='Benchmark {}'.format(number), corevariables=arguments.corevariables,
+                                       items=arguments.items, cases=arguments.cases, seed=arguments.seed + number)
+            questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+            print('Built {} studies x {} cases x {} items in {:.1f}s'.format(
+                arguments.studies, arguments.cases, arguments.corevariables * arguments.items,
+                time.perf_counter() - start))
+
+            # Er wordt gemeten op het laatst toegevoegde onderzoek.
+            queries = hot_queries(study, questionnaire)
+            set_indexes(False)
+            before = run('without indexes', queries, arguments.repeat, not arguments.no_plans)
+            set_indexes(True)
+            after = run('with indexes', queries, arguments.repeat, not arguments.no_plans)
+
+            print('{:<26}{:>14}{:>14}{:>10}'.format('query', 'without (ms)', 'with (ms)', 'speedup'))
+            for (name, function) in queries:
+                print('{:<26}{:>14.1f}{:>14.1f}{:>9.1f}x'.format(name, before[name] * 1000, after[name] * 1000,
+                                                                 before[name] / after[name]))
+            db.session.remove()
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
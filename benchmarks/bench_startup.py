@@ -0,0 +1,73 @@
+# Benchmark van de opstarttijd van de applicatie: ieder scenario wordt een aantal keer in een nieuw Python-proces
+# uitgevoerd (zoals bij het starten van een gunicorn-worker of een "flask"-opdracht). Per scenario worden de mediane en
+# de beste tijd gegeven, en welke rekenmodules (numpy, pandas, plspm, scipy en statsmodels) daarbij geladen zijn.
+#
+# Met --check eindigt het script met exitcode 1 als het opstarten van de applicatie (zonder analyse) een van de
+# rekenmodules laadt; deze horen pas bij het eerste gebruik geladen te worden (zie "app/new_study/analysis.py").
+#
+# Gebruik (vanuit de hoofdmap van de repository):
+#     python benchmarks/bench_startup.py --repeat 5
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+MODULES = ['numpy', 'pandas', 'plspm', 'scipy', 'statsmodels']
+
+# De scenario's als (naam, code). Iedere code wordt in een nieuw proces uitgevoerd, vanuit een tijdelijke map (zodat de
+# logs en sessies van de applicatie niet in de repository terechtkomen) met de hoofdmap van de repository in het pad.
+SCENARIOS = [
+    ('create_app', 'from app import create_app\n'
+                   'create_app()'),
+    ('create_app + analysis', 'from app import create_app\n'
+                              'create_app()\n'
+                              'import app.new_study.analysis'),
+    ('flask cli (main.py)', 'import main'),
+]
+
+# Na het scenario geeft het proces de geladen rekenmodules terug als JSON (op de laatste regel).
+REPORT = '\nimport sys, json\nprint(json.dumps([module for module in {} if module in sys.modules]))'.format(MODULES)
+
+
+# De tijd (in seconden) en de geladen rekenmodules van één keer uitvoeren van de code in een nieuw proces.
+def run_once(code, directory):
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT] + os.environ.get('PYTHONPATH', '').split(
+        os.pathsep)).rstrip(os.pathsep))
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', code + REPORT], cwd=directory, env=environment, check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True).stdout
+    return time.perf_counter() - start, json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the startup time of the application.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of new processes per scenario.')
+    parser.add_argument('--check', action='store_true',
+                        help='Fail if starting the application loads the scientific stack.')
+    arguments = parser.parse_args()
+
+    # Een leeg proces als referentie voor de opstarttijd van Python zelf.
+    scenarios = [('python', 'pass')] + SCENARIOS
+    print('{:<24}{:>14}{:>12}  {}'.format('scenario', 'median (ms)', 'best (ms)', 'scientific modules'))
+    loaded = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for (name, code) in scenarios:
+            times = []
+            for iteration in range(arguments.repeat):
+                seconds, loaded[name] = run_once(code, directory)
+                times.append(seconds)
+            print('{:<24}{:>14.0f}{:>12.0f}  {}'.format(name, statistics.median(times) * 1000, min(times) * 1000,
+                                                       ', '.join(loaded[name]) or '-'))
+
+    if arguments.check and loaded['create_app']:
+        print('FAILED create_app loads {}'.format(', '.join(loaded['create_app'])))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
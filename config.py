@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 
 from dotenv import load_dotenv
 
@@ -18,3 +19,39 @@ class Config(object):
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     ADMINS = ['your-email@example.com']
+    # Het aantal cases per pagina binnen de samenvatting van de resultaten (en het maximum dat opgevraagd kan worden).
+    CASES_PER_PAGE = 50
+    MAX_CASES_PER_PAGE = 500
+    # De opslag van de sessies: "filesystem", "sqlalchemy" of "memory" (zie "app/sessions.py"). Een sessie verloopt
+    # PERMANENT_SESSION_LIFETIME na het laatste verzoek.
+    SESSION_TYPE = os.environ.get('SESSION_TYPE') or 'filesystem'
+    SESSION_PERMANENT = False
+    SESSION_FILE_DIR = os.path.join(basedir, 'flask_session')
+    PERMANENT_SESSION_LIFETIME = timedelta(hours=int(os.environ.get('SESSION_LIFETIME_HOURS') or 24))
+    # Het maximale aantal sessies binnen het proces bij SESSION_TYPE = "memory".
+    SESSION_MEMORY_SIZE = 10000
+    # Hoe lang (in seconden) het Case-id van een participant binnen het proces bewaard blijft.
+    CASE_CACHE_TTL = 300
+    # Hoe lang (in seconden) de opbouw van een vragenlijst van een lopend onderzoek binnen het proces bewaard blijft.
+    QUESTIONNAIRE_CACHE_TTL = 600
+    # Hoe vaak (in seconden) "last_seen" van een ingelogde gebruiker hoogstens bijgewerkt wordt.
+    LAST_SEEN_INTERVAL = int(os.environ.get('LAST_SEEN_INTERVAL') or 300)
+    # Het meten van het aantal queries en de tijd binnen SQL en Python per verzoek (zie "app/instrumentation.py"), met
+    # het aantal bewaarde laatste verzoeken en traagste statements per endpoint.
+    INSTRUMENTATION = os.environ.get('INSTRUMENTATION') is not None
+    INSTRUMENTATION_RECENT = 50
+    INSTRUMENTATION_SLOWEST = 5
+    # Het berekenen van de data-analyse op de achtergrond met "flask analysis worker" (zie "app/analysis/jobs.py"), en
+    # na hoeveel seconden een lopende opdracht opnieuw in de wachtrij gezet wordt.
+    ANALYSIS_JOBS = os.environ.get('ANALYSIS_JOBS') is not None
+    ANALYSIS_JOB_TIMEOUT = 3600
+    # Het aantal bootstrap-steekproeven voor de significantie van de padcoëfficiënten en de betrouwbaarheidsintervallen
+    # van de HTMT-ratio's (0 om niet te bootstrappen, zie "app/analysis/bootstrap.py"), het aantal processen (leeg voor
+    # het aantal processoren), de seed en het betrouwbaarheidsniveau. Er wordt alleen met ANALYSIS_JOBS gebootstrapt.
+    BOOTSTRAP_SAMPLES = int(os.environ.get('BOOTSTRAP_SAMPLES') or 0)
+    BOOTSTRAP_WORKERS = int(os.environ.get('BOOTSTRAP_WORKERS') or 0) or None
+    BOOTSTRAP_SEED = 0
+    BOOTSTRAP_CONFIDENCE = 0.95
+    # De map met de snapshots (memory-mapped antwoordmatrices) van de afgeronde onderzoeken, zie
+    # "app/analysis/snapshot.py".
+    SNAPSHOT_FOLDER = os.environ.get('SNAPSHOT_FOLDER') or os.path.join(basedir, 'snapshots')
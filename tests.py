@@ -1,8 +1,38 @@
 #!/usr/bin/env python
+import json
+import os
+import tempfile
 import unittest
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from statsmodels.stats.outliers_influence import variance_inflation_factor
+from statsmodels.tools.tools import add_constant
 
 from app import create_app, db
-from app.models import User, Study
+from app.analysis.bootstrap import bootstrap
+from app.analysis.cache import cached_results, stored_results
+from app.analysis.dataset import load_dataset, save_snapshot
+from app.analysis.htmt import htmt_ratios
+from app.analysis.jobs import enqueue_analysis, claim_job
+from app.analysis.live import live_statistics
+from app.analysis.pipeline import AnalysisResult, run_pipeline
+from app.analysis.reliability import reliability_table
+from app.analysis.responses import materialize_responses
+from app.analysis.running import load_statistics, record_case
+from app.analysis.vif import block_vif, inner_vif_values_dict
+from app.sessions import MemorySessionInterface, SqlAlchemySessionInterface
+from app.synthetic import generate_study, synthetic_abbreviations
+from app.main.functions import case_ids, reverse_value, session_case_id, submit_case, questionnaire_definition, \
+    forget_questionnaire_definition
+from app.new_study.export import csv_stream, export_rows, xlsx_stream
+from app.new_study.analysis import run_analysis_job, study_snapshot
+from app.new_study.functions import case_page, summary_answers, summary_demographics, summary_statistics, \
+    neighbouring_corevariables
+from app.models import User, Study, UTAUTmodel, CoreVariable, Questionnaire, QuestionGroup, Question, Case, Answer, \
+    SessionData, AnalysisJob, Relation, CaseResponse, Demographic
 from config import Config
 
 
@@ -10,6 +40,8 @@ class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite://'
     ELASTICSEARCH_URL = None
+    # Snapshots van afgeronde onderzoeken komen niet in de map "snapshots" van de repository terecht.
+    SNAPSHOT_FOLDER = tempfile.mkdtemp(prefix='snapshots_')
 
 
 class UserModelCase(unittest.TestCase):
@@ -102,5 +134,579 @@ class UserModelCase(unittest.TestCase):
         self.assertEqual(f4, [s4])
 
 
+class ReliabilityCase(unittest.TestCase):
+    class CoreVariable(object):
+        def __init__(self, abbreviation):
+            self.abbreviation = abbreviation
+
+    def test_reliability_table(self):
+        dataset = pd.DataFrame({'PE1': [1, 2, 4, 5, 3], 'PE2': [2, 2, 5, 4, 3], 'PE3': [1, 3, 4, 5, 2],
+                                'EE1': [5, 4, 1, 2, 3], 'EE2': [4, 4, 2, 1, 3]})
+        table = reliability_table(dataset, [self.CoreVariable('PE'), self.CoreVariable('EE')])
+
+        # Vergelijken met de berekening per item (populatievariantie, gedeeld door het aantal cases).
+        items = ['PE1', 'PE2', 'PE3']
+        item_variances = [np.var(dataset[item].values) for item in items]
+        total_variance = np.var(dataset[items].sum(axis=1).values)
+        alpha = (3 / 2) * ((total_variance - sum(item_variances)) / total_variance)
+
+        self.assertEqual(table['PE']['items'], items)
+        self.assertTrue(np.allclose(table['PE']['item_variances'], item_variances))
+        self.assertAlmostEqual(table['PE']['total_variance'], total_variance)
+        self.assertAlmostEqual(table['PE']['cronbachs_alpha'], alpha)
+        self.assertEqual(table['EE']['items'], ['EE1', 'EE2'])
+
+    def test_htmt_ratios(self):
+        dataset = pd.DataFrame({'PE1': [1, 2, 4, 5, 3], 'PE2': [2, 2, 5, 4, 3], 'PE3': [1, 3, 4, 5, 2],
+                                'EE1': [5, 4, 1, 2, 3], 'EE2': [4, 4, 2, 1, 3]})
+        ratios = htmt_ratios(dataset, [self.CoreVariable('PE'), self.CoreVariable('EE')])
+
+        # Het gemiddelde van de correlaties tussen de items van PE en EE gedeeld door de wortel van het product van de
+        # gemiddelde correlaties binnen PE en binnen EE.
+        correlations = dataset.corr()
+        heterotrait = correlations.loc[['PE1', 'PE2', 'PE3'], ['EE1', 'EE2']].values.mean()
+        monotrait_pe = np.mean([correlations.loc['PE1', 'PE2'], correlations.loc['PE1', 'PE3'],
+                                correlations.loc['PE2', 'PE3']])
+        monotrait_ee = correlations.loc['EE1', 'EE2']
+
+        self.assertAlmostEqual(ratios.loc['PE', 'EE'], heterotrait / np.sqrt(monotrait_pe * monotrait_ee))
+        self.assertAlmostEqual(ratios.loc['EE', 'PE'], ratios.loc['PE', 'EE'])
+        self.assertEqual(ratios.loc['PE', 'PE'], 1)
+
+    def test_vif(self):
+        dataset = pd.DataFrame({'PE1': [1, 2, 4, 5, 3, 2], 'PE2': [2, 2, 5, 4, 3, 1], 'PE3': [1, 3, 4, 5, 2, 4]})
+
+        # Gelijk aan een regressie (met constante) van ieder item op de overige items.
+        X = add_constant(dataset).values
+        expected = [variance_inflation_factor(X, column) for column in range(1, X.shape[1])]
+        self.assertTrue(np.allclose(block_vif(dataset.values.astype(float)), expected))
+
+        inner = inner_vif_values_dict(dataset.rename(columns={'PE1': 'A', 'PE2': 'B', 'PE3': 'C'}),
+                                      [('A', 'C'), ('B', 'C')])
+        self.assertEqual(list(inner['C']), ['A', 'B'])
+        self.assertAlmostEqual(inner['C']['A'], round(variance_inflation_factor(add_constant(dataset[['PE1', 'PE2']])
+                                                                                 .values, 1), 4))
+
+
+class AnalysisCacheCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.model = UTAUTmodel(name='UTAUT')
+        corevariable = CoreVariable(name='Performance Expectancy', abbreviation='PE')
+        db.session.add_all([self.model, corevariable])
+        db.session.commit()
+        corevariable.link(self.model)
+        self.study = Study(name='Kunk', model_id=self.model.id, stage_1=False, stage_3=True)
+        db.session.add(self.study)
+        db.session.commit()
+        self.questionnaire = Questionnaire(study_id=self.study.id, scale=5)
+        db.session.add(self.questionnaire)
+        db.session.commit()
+        questiongroup = QuestionGroup(title='Performance Expectancy', questionnaire_id=self.questionnaire.id,
+                                      corevariable_id=corevariable.id)
+        db.session.add(questiongroup)
+        db.session.commit()
+        self.question = Question(question='Useful?', question_code='PE1', questiongroup_id=questiongroup.id)
+        db.session.add(self.question)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_answer(self, score):
+        case = Case(session_id=str(Case.query.count()), questionnaire_id=self.questionnaire.id, completed=True)
+        db.session.add(case)
+        db.session.commit()
+        db.session.add(Answer(score=score, question_id=self.question.id, case_id=case.id))
+        db.session.commit()
+        return case
+
+    def test_cached_results(self):
+        computed = []
+
+        def compute():
+            computed.append(1)
+            return {'computed': len(computed)}
+
+        self.add_answer(3)
+        self.assertEqual(cached_results(self.study, self.questionnaire, self.model, compute), {'computed': 1})
+        self.assertEqual(cached_results(self.study, self.questionnaire, self.model, compute), {'computed': 1})
+
+        # Een nieuw antwoord verandert de fingerprint, waardoor de resultaten opnieuw berekend worden.
+        self.add_answer(4)
+        self.assertEqual(cached_results(self.study, self.questionnaire, self.model, compute), {'computed': 2})
+        self.assertEqual(len(computed), 2)
+
+    def test_load_dataset(self):
+        self.add_answer(3)
+        case = self.add_answer(4)
+        # Een dubbel antwoord van dezelfde case telt één keer (het laatste antwoord).
+        db.session.add(Answer(score=5, question_id=self.question.id, case_id=case.id))
+        # Een niet-voltooide case wordt standaard niet meegenomen.
+        unfinished = Case(session_id='unfinished', questionnaire_id=self.questionnaire.id, completed=False)
+        db.session.add(unfinished)
+        db.session.commit()
+        db.session.add(Answer(score=1, question_id=self.question.id, case_id=unfinished.id))
+        db.session.commit()
+
+        dataset = load_dataset(self.questionnaire)
+        self.assertEqual(list(dataset.columns), ['PE1'])
+        self.assertEqual(dataset['PE1'].tolist(), [3, 5])
+        self.assertEqual(len(load_dataset(self.questionnaire, completed_only=False)), 3)
+        self.assertRaises(ValueError, load_dataset, self.questionnaire, missing='unknown')
+
+    def test_case_responses(self):
+        self.add_answer(3)
+        case = Case(session_id='submit', questionnaire_id=self.questionnaire.id)
+        db.session.add(case)
+        db.session.commit()
+        submit_case(case.id, {str(self.question.id): '4'}, {})
+        # Bij het versturen wordt de blob direct gemaakt, voor de eerdere case pas bij het laden.
+        self.assertEqual(CaseResponse.query.count(), 1)
+        self.assertEqual(load_dataset(self.questionnaire)['PE1'].tolist(), [3, 4])
+        self.assertEqual(CaseResponse.query.count(), 2)
+        self.assertEqual(materialize_responses(self.questionnaire.id), 0)
+
+        # Na het toevoegen van een vraag worden de blobs opnieuw gemaakt, met de nieuwe vraag als ontbrekend antwoord.
+        db.session.add(Question(question='Fast?', question_code='PE2', questiongroup_id=self.question.questiongroup_id))
+        db.session.commit()
+        self.assertEqual(load_dataset(self.questionnaire, missing='keep')['PE2'].isna().tolist(), [True, True])
+        self.assertEqual(len(load_dataset(self.questionnaire)), 0)
+
+    def test_summary(self):
+        for score in [2, 4, 4, 4, 5, 5, 7, 9]:
+            self.add_answer(score)
+        cases = Case.query.order_by(Case.id).all()
+
+        self.assertEqual(summary_statistics(self.questionnaire, [self.question]), {self.question: [5.0, 2.0]})
+        self.assertEqual(summary_answers(self.questionnaire, cases, [self.question])[cases[0].id], [2])
+        self.assertEqual(summary_demographics(self.questionnaire, cases, []), {})
+
+        # Bij een dubbel antwoord op een vraag telt overal het laatste antwoord: in het overzicht, de export en de
+        # dataset van de data-analyse.
+        db.session.add(Answer(score=3, question_id=self.question.id, case_id=cases[0].id))
+        db.session.commit()
+        self.assertEqual(summary_answers(self.questionnaire, cases, [self.question])[cases[0].id], [3])
+        self.assertEqual(list(export_rows(self.questionnaire, [], [self.question]))[1], [cases[0].id, 3])
+        self.assertEqual(load_dataset(self.questionnaire).loc[cases[0].id, 'PE1'], 3)
+
+    def test_case_page(self):
+        ids = [self.add_answer(3).id for i in range(5)]
+
+        cases, has_previous, has_next = case_page(self.questionnaire, per_page=2)
+        self.assertEqual(([case.id for case in cases], has_previous, has_next), (ids[:2], False, True))
+        cases, has_previous, has_next = case_page(self.questionnaire, after=ids[1], per_page=2)
+        self.assertEqual(([case.id for case in cases], has_previous, has_next), (ids[2:4], True, True))
+        cases, has_previous, has_next = case_page(self.questionnaire, after=ids[3], per_page=2)
+        self.assertEqual(([case.id for case in cases], has_previous, has_next), (ids[4:], True, False))
+        cases, has_previous, has_next = case_page(self.questionnaire, before=ids[2], per_page=2)
+        self.assertEqual(([case.id for case in cases], has_previous, has_next), (ids[:2], False, True))
+
+    def test_session_case_id(self):
+        case_ids.clear()
+        case = self.add_answer(3)
+        self.assertEqual(session_case_id(case.session_id, self.questionnaire.id), case.id)
+        self.assertIsNone(session_case_id(case.session_id, self.questionnaire.id + 1))
+        self.assertIsNone(session_case_id('unknown', self.questionnaire.id))
+
+        # Het Case-id komt daarna uit de cache.
+        db.session.delete(case)
+        db.session.commit()
+        self.assertEqual(session_case_id(case.session_id, self.questionnaire.id), case.id)
+
+    def test_submit_case(self):
+        case = Case(session_id='submit', questionnaire_id=self.questionnaire.id)
+        db.session.add(case)
+        db.session.commit()
+        answers = {self.question.id: 4}
+
+        self.assertTrue(submit_case(case.id, answers, {}))
+        # Een tweede keer versturen slaat de antwoorden niet nog een keer op.
+        self.assertFalse(submit_case(case.id, answers, {}))
+        self.assertTrue(Case.query.get(case.id).completed)
+        self.assertEqual([answer.score for answer in Answer.query.filter_by(case_id=case.id)], [4])
+
+    def test_questionnaire_definition(self):
+        forget_questionnaire_definition(self.study.code)
+        definition = questionnaire_definition(self.study.code)
+        self.assertEqual(definition.question_count, 1)
+        self.assertEqual(definition.question_ids, [self.question.id])
+        self.assertEqual([question.id for question in definition.questiongroups[definition.questiongroup_ids[0]]
+                         .questions], [self.question.id])
+        self.assertIsNone(questionnaire_definition('unknown'))
+
+        # Alleen tijdens stage_2 wordt de opbouw bewaard.
+        self.assertIsNot(questionnaire_definition(self.study.code), definition)
+        self.study.stage_2, self.study.stage_3 = True, False
+        db.session.commit()
+        definition = questionnaire_definition(self.study.code)
+        self.assertIs(questionnaire_definition(self.study.code), definition)
+        forget_questionnaire_definition(self.study.code)
+        self.assertIsNot(questionnaire_definition(self.study.code), definition)
+        forget_questionnaire_definition(self.study.code)
+
+    def test_export(self):
+        first, second = self.add_answer(3), self.add_answer(4)
+
+        rows = list(export_rows(self.questionnaire, [], [self.question]))
+        self.assertEqual(rows, [['ID', 'PE1'], [first.id, 3], [second.id, 4]])
+        self.assertEqual(''.join(csv_stream(rows)), 'ID,PE1\r\n{},3\r\n{},4\r\n'.format(first.id, second.id))
+
+        # Het tijdelijke Excel-bestand verdwijnt na het versturen, maar ook als de response nooit gelezen wordt.
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(tempfile, 'tempdir', directory):
+            chunks, remove = xlsx_stream(rows)
+            self.assertTrue(b''.join(chunks).startswith(b'PK'))
+            self.assertEqual(os.listdir(directory), [])
+            chunks, remove = xlsx_stream(rows)
+            response = self.app.response_class(chunks)
+            response.call_on_close(remove)
+            response.close()
+            self.assertEqual(os.listdir(directory), [])
+
+
+class SyntheticStudyCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_generate_study(self):
+        study = generate_study(corevariables=3, items=3, cases=60, stage=3, seed=1)
+        self.assertTrue(study.stage_3)
+        questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+        dataset = load_dataset(questionnaire)
+        self.assertEqual(dataset.shape, (60, 9))
+        self.assertEqual(list(dataset.columns[:3]), ['SVAA1', 'SVAA2', 'SVAA3'])
+        # De items van een kernvariabele hangen samen.
+        self.assertGreater(dataset[['SVAA1', 'SVAA2']].corr().iloc[0, 1], 0.3)
+
+        # De kernvariabelen worden bij een tweede onderzoek hergebruikt.
+        generate_study(corevariables=3, items=2, cases=5, stage=2)
+        self.assertEqual(CoreVariable.query.count(), 3)
+        self.assertEqual(synthetic_abbreviations(28)[-2:], ['SVBA', 'SVBB'])
+
+
+    def test_analysis_job(self):
+        study = generate_study(corevariables=3, items=3, cases=60, stage=3, seed=1)
+        questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+        model = UTAUTmodel.query.get(study.model_id)
+        job = enqueue_analysis(study)
+        self.assertEqual(enqueue_analysis(study).id, job.id)
+        self.assertIsNone(stored_results(study, questionnaire, model))
+
+        self.assertEqual(claim_job().id, job.id)
+        self.assertIsNone(claim_job())
+        self.assertTrue(run_analysis_job(job))
+        self.assertEqual((job.status, job.progress), ('finished', 100))
+        self.assertIn('SVAA1', stored_results(study, questionnaire, model)['loadings'])
+
+        # Een mislukte opdracht krijgt de status "failed" met de foutmelding.
+        failing = AnalysisJob(study_id=study.id + 1, status='queued')
+        db.session.add(failing)
+        db.session.commit()
+        self.assertFalse(run_analysis_job(claim_job()))
+        self.assertEqual(failing.status, 'failed')
+
+    def test_analysis_pipeline(self):
+        study = generate_study(corevariables=4, items=3, cases=100, stage=3, seed=1)
+        questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+        model = UTAUTmodel.query.get(study.model_id)
+        corevariables = list(model.linked_corevariables)
+
+        result = run_pipeline(questionnaire, model, corevariables)
+        construct = result.construct('SVAB')
+        self.assertEqual(construct.items(), ['SVAB1', 'SVAB2', 'SVAB3'])
+        self.assertEqual(list(construct.outer_vif), ['SVAB1', 'SVAB2', 'SVAB3'])
+        self.assertGreater(construct.average_variance_extracted, 0.5)
+        self.assertEqual(result.htmt_ratio('SVAA', 'SVAB'), result.htmt_ratio('SVAB', 'SVAA'))
+
+        # Een opgeslagen resultaat (als JSON) geeft hetzelfde resultaat.
+        stored = AnalysisResult.from_dict(json.loads(json.dumps(result.to_dict())))
+        self.assertEqual(stored.to_dict(), result.to_dict())
+        self.assertEqual(stored.construct('SVAB').loadings, construct.loadings)
+
+        self.assertEqual(neighbouring_corevariables(corevariables, corevariables[0]), corevariables[:3])
+        self.assertEqual(neighbouring_corevariables(corevariables, corevariables[2]), corevariables[1:4])
+        self.assertEqual(neighbouring_corevariables(corevariables, corevariables[3]), corevariables[1:4])
+        self.assertEqual(neighbouring_corevariables(corevariables[:2], corevariables[1]), corevariables[:2])
+
+    def test_live_statistics(self):
+        study = generate_study(corevariables=3, items=3, cases=40, stage=2, seed=1)
+        questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+        corevariables = list(UTAUTmodel.query.get(study.model_id).linked_corevariables)
+        questions = Question.query.join(QuestionGroup).filter(QuestionGroup.questionnaire_id == questionnaire.id) \
+            .order_by(QuestionGroup.id, Question.id).all()
+
+        # De statistieken worden eenmalig uit de antwoorden opgebouwd en daarna per verstuurde vragenlijst bijgewerkt.
+        self.assertEqual(live_statistics(questionnaire, corevariables).count, 40)
+        rng = np.random.default_rng(2)
+        for number in range(10):
+            case = Case(session_id='live{}'.format(number), questionnaire_id=questionnaire.id)
+            db.session.add(case)
+            db.session.commit()
+            submit_case(case.id, {str(question.id): str(rng.integers(1, 6)) for question in questions}, {})
+        self.assertEqual(load_statistics(questionnaire.id)[1]['count'], 50)
+
+        # Dezelfde uitkomsten als de berekening over alle antwoorden.
+        statistics = live_statistics(questionnaire, corevariables)
+        dataset = load_dataset(questionnaire)
+        self.assertEqual(statistics.count, 50)
+        np.testing.assert_allclose(list(statistics.means.values()), dataset.mean())
+        np.testing.assert_allclose(list(statistics.standard_deviations.values()), dataset.std())
+        np.testing.assert_allclose(statistics.correlations, dataset.corr())
+        table = reliability_table(dataset, corevariables)
+        for corevariable in corevariables:
+            self.assertAlmostEqual(statistics.cronbachs_alphas[corevariable.abbreviation],
+                                   table[corevariable.abbreviation]['cronbachs_alpha'])
+        pd.testing.assert_frame_equal(statistics.htmt_ratios, htmt_ratios(dataset, corevariables))
+
+    def test_live_statistics_interleaving(self):
+        study = generate_study(corevariables=3, items=3, cases=20, stage=2, seed=1)
+        questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+        corevariables = list(UTAUTmodel.query.get(study.model_id).linked_corevariables)
+        questions = Question.query.join(QuestionGroup).filter(QuestionGroup.questionnaire_id == questionnaire.id) \
+            .order_by(QuestionGroup.id, Question.id).all()
+        answers = {str(question.id): '3' for question in questions}
+        self.assertEqual(live_statistics(questionnaire, corevariables).count, 20)
+        first = Case(session_id='first', questionnaire_id=questionnaire.id)
+        second = Case(session_id='second', questionnaire_id=questionnaire.id)
+        db.session.add_all([first, second])
+        db.session.commit()
+
+        # Worden de statistieken tussen het opslaan van de antwoorden en het bijwerken opnieuw opgebouwd, dan telt de
+        # case maar één keer mee.
+        with mock.patch('app.main.functions.record_case') as deferred:
+            submit_case(second.id, answers, {})
+        self.assertEqual(live_statistics(questionnaire, corevariables).count, 21)
+        self.assertFalse(record_case(*deferred.call_args.args))
+        self.assertEqual(load_statistics(questionnaire.id)[1]['count'], 21)
+
+        # Een eerder begonnen case die later voltooid wordt telt gewoon mee.
+        submit_case(first.id, answers, {})
+        self.assertEqual(load_statistics(questionnaire.id)[1]['count'], 22)
+        self.assertEqual(live_statistics(questionnaire, corevariables).count, 22)
+        self.assertEqual(len(load_dataset(questionnaire)), 22)
+
+    def test_snapshot(self):
+        study = generate_study(corevariables=3, items=3, cases=30, stage=3, seed=1)
+        questionnaire = Questionnaire.query.filter_by(study_id=study.id).first()
+        questions = Question.query.join(QuestionGroup).filter(QuestionGroup.questionnaire_id == questionnaire.id) \
+            .order_by(QuestionGroup.id, Question.id).all()
+        unfinished = Case(session_id='unfinished', questionnaire_id=questionnaire.id)
+        db.session.add(unfinished)
+        db.session.commit()
+        db.session.add(Answer(score=2, question_id=questions[0].id, case_id=unfinished.id))
+        db.session.commit()
+        dataset = load_dataset(questionnaire)
+        rows = list(export_rows(questionnaire, [], questions))
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.app.config['SNAPSHOT_FOLDER'] = directory
+            snapshot = save_snapshot(questionnaire)
+            self.assertIsInstance(snapshot.scores, np.memmap)
+            self.assertEqual(snapshot.scores.dtype, np.int8)
+            # De dataset en de export uit de snapshot zijn gelijk aan die uit de database.
+            pd.testing.assert_frame_equal(load_dataset(questionnaire), dataset)
+            self.assertEqual(list(export_rows(questionnaire, [], questions, snapshot)), rows)
+
+            # Een opnieuw gemaakte blob of een later voltooide case maakt de snapshot ongeldig, waarna de dataset weer
+            # uit de database komt.
+            CaseResponse.query.filter_by(case_id=int(snapshot.case_ids[-1])).delete()
+            db.session.commit()
+            self.assertIsNone(study_snapshot(questionnaire, questions))
+            pd.testing.assert_frame_equal(load_dataset(questionnaire), dataset)
+            unfinished.completed = True
+            db.session.commit()
+            self.assertEqual(len(load_dataset(questionnaire, missing='keep')), 31)
+
+    def test_bootstrap(self):
+        study = generate_study(corevariables=3, items=3, cases=150, stage=3, seed=1)
+        dataset = load_dataset(Questionnaire.query.filter_by(study_id=study.id).first())
+        model = UTAUTmodel.query.get(study.model_id)
+        corevariables = list(model.linked_corevariables)
+        relations = Relation.query.filter_by(model_id=model.id).all()
+
+        results = bootstrap(dataset, corevariables, relations, samples=12, workers=1, seed=3)
+        self.assertEqual(list(results.paths.index), ['SVAA -> SVAB', 'SVAB -> SVAC'])
+        self.assertEqual(list(results.htmt.index), ['SVAA - SVAB', 'SVAA - SVAC', 'SVAB - SVAC'])
+        self.assertEqual(results.valid, 12)
+        # De gesimuleerde paden (0.5) zijn significant.
+        self.assertTrue((results.paths['lower'] > 0).all())
+        self.assertTrue((results.paths['t_value'] > 2).all())
+
+        # Dezelfde seed geeft dezelfde uitkomst, ongeacht het aantal processen.
+        parallel = bootstrap(dataset, corevariables, relations, samples=12, workers=2, seed=3)
+        pd.testing.assert_frame_equal(results.paths, parallel.paths)
+        pd.testing.assert_frame_equal(results.htmt, parallel.htmt)
+
+
+class InstrumentationConfig(TestConfig):
+    INSTRUMENTATION = True
+    ADMINS = ['admin@example.com']
+
+
+class InstrumentationCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(InstrumentationConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_metrics(self):
+        admin = User(username='admin', email='admin@example.com')
+        db.session.add(admin)
+        db.session.commit()
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin.id)
+            session['_fresh'] = True
+
+        self.assertEqual(client.get('/user/admin').status_code, 200)
+        metrics = client.get('/admin/metrics?format=json').get_json()
+        self.assertTrue(metrics['enabled'])
+        endpoint = [endpoint for endpoint in metrics['endpoints'] if endpoint['endpoint'] == 'main.user'][0]
+        self.assertEqual(endpoint['requests'], 1)
+        self.assertGreater(endpoint['queries'], 0)
+        self.assertEqual(metrics['recent'][0]['path'], '/user/admin')
+        self.assertEqual(client.get('/admin/metrics').status_code, 200)
+
+
+class ParticipantConfig(TestConfig):
+    WTF_CSRF_ENABLED = False
+    # De sessie gaat via de database heen en terug, zoals bij meerdere processen.
+    SESSION_TYPE = 'sqlalchemy'
+
+
+class ParticipantCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(ParticipantConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_session_answers(self):
+        study = generate_study(corevariables=2, items=2, cases=0, demographics=1, stage=2, seed=0)
+        code = study.code
+        definition = questionnaire_definition(code)
+        demographic = Demographic.query.filter_by(questionnaire_id=definition.questionnaire_id).first()
+        client = self.app.test_client()
+        client.get('/d/e/{}'.format(code))
+        client.post('/d/e/start/{}'.format(code), data={demographic.name: demographic.choices.split(',')[0]})
+        for (number, questiongroup_id) in enumerate(definition.questiongroup_ids):
+            questions = definition.questiongroups[questiongroup_id].questions
+            client.post('/c/e/{}/{}'.format(code, number), data={question.question: '4' for question in questions})
+
+        # De antwoorden staan in de sessie als {vraag-ID: score}, met de omgedraaide score waar dat moet.
+        expected = {question.id: reverse_value('4', definition.scale) if question.reversed_score else '4'
+                    for questiongroup_id in definition.questiongroup_ids
+                    for question in definition.questiongroups[questiongroup_id].questions}
+        with client.session_transaction() as session:
+            self.assertEqual(session['answers'], expected)
+            self.assertEqual(session['demographic_answers'], {demographic.id: demographic.choices.split(',')[0]})
+
+        self.assertEqual(client.post('/g/e/{}'.format(code)).get_data(as_text=True), 'Thank you for participating.')
+        case = Case.query.filter_by(questionnaire_id=definition.questionnaire_id).one()
+        self.assertTrue(case.completed)
+        self.assertEqual({answer.question_id: answer.score for answer in Answer.query.filter_by(case_id=case.id)},
+                         {question_id: int(score) for (question_id, score) in expected.items()})
+        forget_questionnaire_definition(code)
+
+    def test_last_seen(self):
+        user = User(username='susan', email='susan@example.com')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+
+        client.get('/index')
+        last_seen = User.query.get(user_id).last_seen
+        self.assertIsNotNone(last_seen)
+        # Binnen LAST_SEEN_INTERVAL blijft "last_seen" staan, daarna wordt deze bijgewerkt.
+        client.get('/index')
+        self.assertEqual(User.query.get(user_id).last_seen, last_seen)
+        earlier = last_seen - timedelta(seconds=self.app.config['LAST_SEEN_INTERVAL'] + 1)
+        User.query.get(user_id).last_seen = earlier
+        db.session.commit()
+        client.get('/index')
+        self.assertGreater(User.query.get(user_id).last_seen, earlier)
+
+
+class SessionCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_memory_sessions(self):
+        sessions = MemorySessionInterface(2)
+        sessions.store('a', {'user': 'a'}, timedelta(hours=1))
+        sessions.store('b', {'user': 'b'}, timedelta(hours=1))
+        self.assertEqual(sessions.load('a'), {'user': 'a'})
+        # De langst niet gebruikte sessie ("b") valt uit de cache.
+        sessions.store('c', {'user': 'c'}, timedelta(hours=1))
+        self.assertIsNone(sessions.load('b'))
+        sessions.store('d', {'user': 'd'}, timedelta(hours=-1))
+        self.assertEqual(sessions.collect_expired(), 1)
+        self.assertEqual(sessions.load('c'), {'user': 'c'})
+
+    def test_sqlalchemy_sessions(self):
+        sessions = SqlAlchemySessionInterface()
+        sessions.store('a', {'user': 'a'}, timedelta(hours=1))
+        sessions.store('b', {'user': 'b'}, timedelta(hours=-1))
+        self.assertEqual(sessions.load('a'), {'user': 'a'})
+        self.assertIsNone(sessions.load('b'))
+        self.assertEqual(sessions.collect_expired(), 1)
+        self.assertEqual(SessionData.query.count(), 1)
+
+    def test_unmodified_session(self):
+        sessions = SqlAlchemySessionInterface()
+        sessions.store('a', {'user': 'a'}, timedelta(hours=1))
+        expiry = db.session.query(SessionData.expiry).filter_by(session_id='a').scalar()
+        cookie = '{}=a'.format(self.app.config['SESSION_COOKIE_NAME'])
+        with self.app.test_request_context('/', headers={'Cookie': cookie}) as context:
+            session = sessions.open_session(self.app, context.request)
+            self.assertEqual(session['user'], 'a')
+            # Een ongewijzigde sessie wordt niet opnieuw opgeslagen.
+            response = self.app.response_class()
+            sessions.save_session(self.app, session, response)
+            self.assertNotIn('Set-Cookie', response.headers)
+            self.assertEqual(db.session.query(SessionData.expiry).filter_by(session_id='a').scalar(), expiry)
+            session['user'] = 'b'
+            sessions.save_session(self.app, session, response)
+            self.assertIn('Set-Cookie', response.headers)
+        self.assertEqual(sessions.load('a'), {'user': 'b'})
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
\ No newline at end of file